@@ -38,14 +38,6 @@ EOF
 
 # Load initial data if needed
 echo "📊 Loading initial flight data..."
-python manage.py shell << EOF
-from flight.models import Place, Flight
-if Place.objects.count() == 0:
-    print('Loading initial data...')
-    exec(open('Data/add_places.py').read())
-    print('Initial data loaded successfully')
-else:
-    print('Data already exists, skipping initial load')
-EOF
+python manage.py seed_catalog
 
 echo "✅ Build process completed successfully!"
\ No newline at end of file
@@ -0,0 +1,8 @@
+"""
+Helpers shared by the settings modules for configuring database connections.
+"""
+
+
+def conn_max_age(value):
+    """Cast for DB_CONN_MAX_AGE: seconds to keep a connection open, or "none" to keep it for good."""
+    return None if value.lower() == 'none' else int(value)
@@ -0,0 +1,50 @@
+"""
+HTML to PDF conversion. Kept free of Django imports so it can run in a worker process.
+"""
+import os
+import tempfile
+from io import BytesIO
+from pathlib import Path
+
+# Optional: PDF tickets are only available when xhtml2pdf is installed
+try:
+    from xhtml2pdf import pisa
+except ImportError:
+    pisa = None
+
+
+def available():
+    return pisa is not None
+
+
+def html_to_pdf(html):
+    """PDF bytes for an HTML document, or None if xhtml2pdf is missing or the layout failed."""
+    if pisa is None:
+        return None
+    result = BytesIO()
+    pdf = pisa.pisaDocument(BytesIO(html.encode('utf-8')), result, encoding='utf-8')
+    if pdf.err:
+        return None
+    return result.getvalue()
+
+
+def html_to_file(html, path):
+    """
+    Lay out an HTML document straight into the PDF file `path` (<ref>-<hash>.pdf), written atomically,
+    then drop the PDFs of earlier versions of the same ref. Returns False if no PDF could be made.
+    Only the path goes back to the caller, so the PDF bytes never leave the worker process.
+    """
+    pdf = html_to_pdf(html)
+    if pdf is None:
+        return False
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as file:
+        file.write(pdf)
+    os.replace(tmp, path)
+    ref = path.name.rsplit('-', 1)[0]
+    for old in path.parent.glob(f'{ref}-*.pdf'):
+        if old != path:
+            old.unlink(missing_ok=True)
+    return True
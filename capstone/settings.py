@@ -12,8 +12,11 @@ https://docs.djangoproject.com/en/3.1/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 from decouple import config
 
+from .dbconfig import conn_max_age
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -82,9 +85,28 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Off by default for runserver, which opens a thread per request; set DB_CONN_MAX_AGE to
+        # reuse a worker's connection across requests (seconds; "none" keeps it open for good)
+        'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default='0', cast=conn_max_age),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+    }
+}
+
+
+# Cache
+# Catalogue versions and cached ticket data must be seen by every process (each gunicorn worker,
+# reap_tickets), so the default cache lives on disk rather than in per-process memory.
+# Processes on different hosts need a network cache such as Redis instead.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('CACHE_DIR', default=str(Path(tempfile.gettempdir()) / 'flight-booking-cache')),
     }
 }
 
+TEST_RUNNER = 'capstone.testrunner.TestRunner'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -0,0 +1,8 @@
+"""
+Django settings for Render deployment with MongoDB (set MONGODB_URI).
+
+settings_render already switches on MONGODB_URI, and configures connection reuse
+(DB_CONN_MAX_AGE, DB_CONN_HEALTH_CHECKS, DB_PGBOUNCER) for the Django database.
+"""
+
+from .settings_render import *  # noqa: F401,F403
@@ -3,10 +3,13 @@ Django settings for Render deployment with MongoDB support
 """
 
 import os
+import tempfile
 from pathlib import Path
 from decouple import config
 import dj_database_url
 
+from .dbconfig import conn_max_age
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -75,6 +78,40 @@ WSGI_APPLICATION = 'capstone.wsgi.application'
 MONGODB_URI = config('MONGODB_URI', default='')
 REDIS_URL = config('REDIS_URL', default='')
 
+# Connection reuse: keep each worker's connection open for DB_CONN_MAX_AGE seconds (None = forever)
+# instead of reconnecting per request, and check it is still alive before reusing it.
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default='600', cast=conn_max_age)
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+# Set when DATABASE_URL points at PgBouncer in transaction pooling mode: server-side cursors and
+# prepared statements don't survive a transaction moving between server connections.
+DB_PGBOUNCER = config('DB_PGBOUNCER', default=False, cast=bool)
+
+
+def database_from_url(url):
+    database = dj_database_url.parse(
+        url,
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=DB_CONN_HEALTH_CHECKS,
+    )
+    database['DISABLE_SERVER_SIDE_CURSORS'] = DB_PGBOUNCER
+    if DB_PGBOUNCER:
+        try:
+            import psycopg     # psycopg 3 prepares repeated queries server-side unless told not to
+        except ImportError:
+            pass
+        else:
+            database.setdefault('OPTIONS', {})['prepare_threshold'] = None
+    return database
+
+
+def sqlite_database(name):
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / name,
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+    }
+
 if MONGODB_URI:
     # MongoDB configuration
     MONGODB_SETTINGS = {
@@ -87,30 +124,24 @@ if MONGODB_URI:
     DATABASE_URL = config('DATABASE_URL', default='')
     if DATABASE_URL:
         DATABASES = {
-            'default': dj_database_url.parse(DATABASE_URL)
+            'default': database_from_url(DATABASE_URL)
         }
     else:
         # Fallback to SQLite for development
         DATABASES = {
-            'default': {
-                'ENGINE': 'django.db.backends.sqlite3',
-                'NAME': BASE_DIR / 'db_sessions.sqlite3',
-            }
+            'default': sqlite_database('db_sessions.sqlite3')
         }
 else:
     # PostgreSQL configuration for Render
     DATABASE_URL = config('DATABASE_URL', default='')
     if DATABASE_URL:
         DATABASES = {
-            'default': dj_database_url.parse(DATABASE_URL)
+            'default': database_from_url(DATABASE_URL)
         }
     else:
         # Fallback to SQLite for development
         DATABASES = {
-            'default': {
-                'ENGINE': 'django.db.backends.sqlite3',
-                'NAME': BASE_DIR / 'db.sqlite3',
-            }
+            'default': sqlite_database('db.sqlite3')
         }
 
 # Redis Cache Configuration
@@ -129,9 +160,20 @@ if REDIS_URL:
     SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
     SESSION_CACHE_ALIAS = 'default'
 else:
+    # Without Redis the workers of one instance share a cache on disk; the per-process default
+    # would leave each worker with its own catalogue versions and ticket data.
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config('CACHE_DIR', default=str(Path(tempfile.gettempdir()) / 'flight-booking-cache')),
+        }
+    }
+
     # Fallback to database sessions
     SESSION_ENGINE = 'django.contrib.sessions.backends.db'
 
+TEST_RUNNER = 'capstone.testrunner.TestRunner'
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -0,0 +1,29 @@
+"""
+Test runner that keeps the suite off the cache shared by runserver and the gunicorn workers.
+"""
+import shutil
+import tempfile
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """Points every file-based cache at a scratch directory for the duration of the run."""
+
+    def setup_test_environment(self, **kwargs):
+        from django.conf import settings
+        super().setup_test_environment(**kwargs)
+        self.cache_dir = tempfile.mkdtemp(prefix='flight-test-cache-')
+        caches = {
+            alias: {**options, 'LOCATION': f'{self.cache_dir}/{alias}'}
+            if options['BACKEND'].endswith('FileBasedCache') else options
+            for alias, options in settings.CACHES.items()
+        }
+        self.caches = override_settings(CACHES=caches)
+        self.caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self.caches.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -1,30 +1,18 @@
-from io import BytesIO
-from django.http import HttpResponse
-from django.template.loader import get_template
-
 from flight.models import *
-import secrets
 from datetime import datetime, timedelta
-# from xhtml2pdf import pisa
 
 from flight.constant import FEE
+from flight.inventory import reserve, hold_expiry
+from flight.refs import next_ref
 
-def render_to_pdf(template_src, context_dict={}):
-    template = get_template(template_src)
-    html  = template.render(context_dict)
-    result = BytesIO()
-    # pdf = pisa.pisaDocument(BytesIO(html.encode("ISO-8859-1")), result)
-    # if not pdf.err:
-    #     return HttpResponse(result.getvalue(), content_type='application/pdf')
-    # return None
-
-
-def createticket(user,passengers,passengerscount,flight1,flight_1date,flight_1class,coupon,countrycode,email,mobile):
-    ticket = Ticket.objects.create()
-    ticket.user = user
-    ticket.ref_no = secrets.token_hex(3).upper()
-    for passenger in passengers:
-        ticket.passengers.add(passenger)
+def createticket(user,passengers,passengerscount,flight1,flight_1date,flight_1class,coupon,countrycode,email,mobile,ref_no=None):
+    """
+    Hold the seats, insert a PENDING ticket with a single INSERT, then link its (already saved) passengers
+    in one more. Raises flight.inventory.SoldOut when the cabin is full; call inside a transaction, passing
+    a `ref_no` taken from flight.refs.next_ref() beforehand.
+    """
+    ticket = Ticket(user=user)
+    ticket.ref_no = ref_no or next_ref()
     ticket.flight = flight1
     ticket.flight_ddate = datetime(int(flight_1date.split('-')[2]),int(flight_1date.split('-')[1]),int(flight_1date.split('-')[0]))
     ###################
@@ -47,8 +35,14 @@ def createticket(user,passengers,passengerscount,flight1,flight_1date,flight_1cl
         ticket.coupon_used = coupon                     ##########Coupon
     ticket.total_fare = ffre+FEE+0.0                    ##########Total(Including coupon)
     ticket.seat_class = flight_1class.lower()
+    reserve(flight1, ticket.flight_ddate.date(), ticket.seat_class, int(passengerscount))
+    ticket.seat_count = int(passengerscount)
+    ticket.hold_expires = hold_expiry()
     ticket.status = 'PENDING'
     ticket.mobile = ('+'+countrycode+' '+mobile)
     ticket.email = email
     ticket.save()
-    return ticket
\ No newline at end of file
+    Ticket.passengers.through.objects.bulk_create([
+        Ticket.passengers.through(ticket_id=ticket.id, passenger_id=passenger.id) for passenger in passengers
+    ])
+    return ticket
@@ -1,8 +1,9 @@
 #!/bin/sh
 set -e
 
-# run migrations and collectstatic (no input)
+# run migrations, seed the flight catalogue and collectstatic (no input)
 python manage.py migrate --noinput
+python manage.py seed_catalog
 python manage.py collectstatic --noinput
 
 # pass control to CMD (gunicorn)
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class FlightConfig(AppConfig):
     name = 'flight'
+
+    def ready(self):
+        from . import signals
+        signals.connect()
@@ -0,0 +1,132 @@
+"""
+In-memory airport autocomplete index behind /query/places/<q>.
+
+Every 1-, 2- and 3-gram of a place's city, airport, code and country maps to
+the places containing it, so a keystroke is answered with a few set lookups
+instead of a scan of the Place table.
+"""
+import gzip
+import hashlib
+import json
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import catalogue
+from .catalogue import LazyIndex
+from .models import Place
+
+# Optional brotli support for the precomputed response bodies
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+GRAM = 3
+RESPONSE_TIMEOUT = getattr(settings, 'PLACES_RESPONSE_CACHE_TIMEOUT', 60 * 60)
+MIN_COMPRESS_SIZE = 256
+
+Suggestion = namedtuple('Suggestion', ['code', 'city', 'airport', 'country'])
+
+
+def grams(text, size):
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class PlaceIndex:
+    def __init__(self, places):
+        # Position in this list is the tie-break within a ranking tier.
+        self.places = sorted(places, key=lambda p: (p.city.lower(), p.code))
+        self.texts = []
+        self.codes = {}
+        self.city_prefixes = defaultdict(list)
+        self.grams = defaultdict(set)
+        for i, place in enumerate(self.places):
+            fields = [value.lower() for value in place]
+            self.texts.append(fields)
+            self.codes[place.code.lower()] = i
+            city = place.city.lower()
+            for end in range(1, len(city) + 1):
+                self.city_prefixes[city[:end]].append(i)
+            for field in fields:
+                for size in range(1, GRAM + 1):
+                    for gram in grams(field, size):
+                        self.grams[gram].add(i)
+
+    @classmethod
+    def build(cls):
+        return cls([Suggestion(*row) for row in Place.objects.values_list('code', 'city', 'airport', 'country')])
+
+    def substring_matches(self, q):
+        if len(q) <= GRAM:
+            return self.grams.get(q, set())
+        candidates = None
+        for gram in grams(q, GRAM):
+            ids = self.grams.get(gram)
+            if not ids:
+                return set()
+            candidates = ids if candidates is None else candidates & ids
+        return {i for i in candidates if any(q in field for field in self.texts[i])}
+
+    def search(self, q, limit=DEFAULT_LIMIT):
+        """Exact code match first, then city prefix matches, then substring matches on any field."""
+        q = q.strip().lower()
+        if not q:
+            return []
+        ranked = []
+        if q in self.codes:
+            ranked.append(self.codes[q])
+        ranked.extend(self.city_prefixes.get(q, ()))
+        ranked.extend(sorted(self.substring_matches(q)))
+
+        results, seen = [], set()
+        for i in ranked:
+            if i not in seen:
+                seen.add(i)
+                results.append(self.places[i])
+                if len(results) == limit:
+                    break
+        return results
+
+
+_index = LazyIndex(PlaceIndex.build, catalogue='places')
+get_place_index = _index.get
+
+
+def normalise(q):
+    return ' '.join(q.lower().split())
+
+
+def encode(body):
+    """The JSON body plus any precomputed compressed variants worth sending, keyed by content coding."""
+    variants = {'identity': body}
+    if len(body) >= MIN_COMPRESS_SIZE:
+        variants['gzip'] = gzip.compress(body, compresslevel=9)
+        if brotli is not None:
+            variants['br'] = brotli.compress(body)
+    return variants
+
+
+def response_variants(q, limit):
+    """Serialised (and compressed) suggestions for a query, cached per catalogue version."""
+    q = normalise(q)
+    digest = hashlib.sha1(q.encode()).hexdigest()
+    key = f"places-query:{catalogue.version('places')}:{limit}:{digest}"
+    variants = cache.get(key)
+    if variants is None:
+        places = get_place_index().search(q, limit)
+        body = json.dumps([{'code': p.code, 'city': p.city, 'country': p.country} for p in places]).encode()
+        variants = encode(body)
+        cache.set(key, variants, RESPONSE_TIMEOUT)
+    return variants
+
+
+def pick_encoding(variants, accept_encoding):
+    accepted = {coding.split(';')[0].strip() for coding in accept_encoding.lower().split(',')}
+    for coding in ('br', 'gzip'):
+        if coding in variants and coding in accepted:
+            return coding
+    return 'identity'
@@ -0,0 +1,67 @@
+"""
+Helpers for the read-mostly flight catalogue (places and the schedule).
+
+Each catalogue has a version kept in the default Django cache, so every worker sharing
+the cache sees it change. The version is a timestamp in microseconds, which
+lets it double as the Last-Modified time of anything derived from it.
+
+Versions are only as shared as that cache: with the per-process LocMemCache a bump is
+invisible to other workers and to seed_catalog run from a shell, and their indexes go
+stale. The settings therefore configure a file cache (one host) or Redis (REDIS_URL).
+"""
+import threading
+import time
+
+from django.core.cache import cache
+
+
+def version_key(name):
+    return f'catalogue-version:{name}'
+
+
+def version(name):
+    value = cache.get(version_key(name))
+    if value is None:
+        cache.add(version_key(name), time.time_ns() // 1000, None)
+        value = cache.get(version_key(name))
+    return value
+
+
+def bump(name):
+    current = cache.get(version_key(name)) or 0
+    cache.set(version_key(name), max(time.time_ns() // 1000, current + 1), None)
+
+
+def modified_at(name):
+    """Unix time of the last change to the catalogue."""
+    return version(name) / 1_000_000
+
+
+class LazyIndex:
+    """
+    A process-local structure built on first use by `build()`. With a `catalogue` name it is
+    rebuilt whenever that catalogue's version moves on. Builds run under a lock.
+    """
+
+    def __init__(self, build, catalogue=None):
+        self.build = build
+        self.catalogue = catalogue
+        self.value = None
+        self.built_version = None
+        self.lock = threading.Lock()
+
+    def current_version(self):
+        return version(self.catalogue) if self.catalogue else None
+
+    def get(self):
+        value = self.value
+        current = self.current_version()
+        if value is None or current != self.built_version:
+            with self.lock:
+                value = self.value
+                if value is None or current != self.built_version:
+                    value = self.build()
+                    self.value = value
+                    self.built_version = current
+        return value
+
@@ -0,0 +1,179 @@
+"""
+Connecting-itinerary search (direct, one- and two-stop) over the in-memory timetable.
+
+Times are minutes from midnight of the departure date. A flight operating on
+weekday w at minute m of the day sits at minute w * 1440 + m of the week, and
+arrives `duration` later, which carries any overnight or week rollover.
+
+The search is a bounded label-setting scan: starting from the flights leaving the
+origin on the requested day, each round extends every label by the flights that
+leave its airport within the allowed connection window. Labels at an airport are
+pruned to those not dominated on (arrival, fare, first departure), and airports
+that cannot reach the destination within the remaining legs are never expanded.
+"""
+from bisect import bisect_left
+from collections import defaultdict, namedtuple
+from datetime import datetime, timedelta
+
+from django.conf import settings
+
+from .catalogue import LazyIndex
+from .timetable import SEAT_CLASSES, fare_of, get_timetable
+
+DAY = 24 * 60
+WEEK = 7 * DAY
+MIN_CONNECTION = getattr(settings, 'CONNECTION_MIN_MINUTES', 45)
+MAX_CONNECTION = getattr(settings, 'CONNECTION_MAX_MINUTES', 12 * 60)
+MAX_STOPS = 2
+MAX_ITINERARIES = 10
+
+Departure = namedtuple('Departure', ['week_minute', 'duration', 'fare', 'flight'])
+Leg = namedtuple('Leg', ['flight', 'depart', 'arrive', 'fare'])
+Label = namedtuple('Label', ['airport', 'arrive', 'fare', 'start', 'legs'])
+
+
+def minutes(value):
+    return int(value.total_seconds() // 60)
+
+
+class ConnectionGraph:
+    def __init__(self, departures, inbound):
+        self.departures = departures    # (seat, airport) -> [Departure] sorted by week_minute
+        self.keys = {key: [d.week_minute for d in deps] for key, deps in departures.items()}
+        self.inbound = inbound          # (seat, airport) -> airports with a flight into it
+
+    @classmethod
+    def build(cls):
+        departures = defaultdict(list)
+        inbound = defaultdict(set)
+        for (origin, destination, weekday, seat), flights in get_timetable().routes.items():
+            inbound[(seat, destination)].add(origin)
+            for flight in flights:
+                if flight.duration is None:
+                    continue
+                week_minute = weekday * DAY + flight.depart_time.hour * 60 + flight.depart_time.minute
+                departures[(seat, origin)].append(
+                    Departure(week_minute, minutes(flight.duration), fare_of(flight, seat), flight)
+                )
+        for deps in departures.values():
+            deps.sort(key=lambda d: (d.week_minute, d.fare))
+        return cls(dict(departures), dict(inbound))
+
+    def leaving(self, seat, airport, week_start, earliest, latest):
+        """Legs leaving `airport` between absolute minutes `earliest` and `latest` (inclusive)."""
+        deps = self.departures.get((seat, airport))
+        if not deps or latest < earliest:
+            return
+        keys = self.keys[(seat, airport)]
+        start = (week_start + earliest) % WEEK
+        span = latest - earliest
+        i = bisect_left(keys, start)
+        n = len(deps)
+        for step in range(n):
+            dep = deps[(i + step) % n]
+            offset = (dep.week_minute - start) % WEEK
+            if offset > span:
+                break
+            depart = earliest + offset
+            yield Leg(dep.flight, depart, depart + dep.duration, dep.fare)
+
+    def reachable(self, seat, destination, legs):
+        """Airports from which `destination` can be reached in at most `legs` flights."""
+        reach = {destination}
+        frontier = {destination}
+        for _ in range(legs):
+            frontier = {a for airport in frontier for a in self.inbound.get((seat, airport), ())} - reach
+            reach |= frontier
+        return reach
+
+    def search(self, origin, destination, date, seat, max_stops=MAX_STOPS,
+               min_connection=MIN_CONNECTION, max_connection=MAX_CONNECTION):
+        seat = seat.lower()
+        origin, destination = origin.upper(), destination.upper()
+        if seat not in SEAT_CLASSES or origin == destination:
+            return []
+        week_start = date.weekday() * DAY
+        # reach[k]: airports that can get to the destination in at most k more flights.
+        reach = [self.reachable(seat, destination, k) for k in range(max_stops + 2)]
+        if origin not in reach[max_stops + 1]:
+            return []
+
+        itineraries = []
+        frontier = [Label(origin, None, 0.0, None, ())]
+        for depth in range(max_stops + 1):
+            remaining = max_stops - depth
+            labels = defaultdict(list)
+            for label in frontier:
+                if label.arrive is None:
+                    window = (0, DAY - 1)
+                else:
+                    window = (label.arrive + min_connection, label.arrive + max_connection)
+                visited = {origin, *(leg.flight.destination.code for leg in label.legs)}
+                for leg in self.leaving(seat, label.airport, week_start, *window):
+                    to = leg.flight.destination.code
+                    legs = label.legs + (leg,)
+                    start = label.start if label.start is not None else leg.depart
+                    fare = label.fare + leg.fare
+                    if to == destination:
+                        itineraries.append(Label(to, leg.arrive, fare, start, legs))
+                    elif remaining and to not in visited and to in reach[remaining]:
+                        add_label(labels[to], Label(to, leg.arrive, fare, start, legs))
+            frontier = [label for group in labels.values() for label in group]
+            if not frontier:
+                break
+        return pareto(itineraries)
+
+
+def dominates(a, b):
+    return a.arrive <= b.arrive and a.fare <= b.fare and a.start >= b.start
+
+
+def add_label(labels, label):
+    if any(dominates(other, label) for other in labels):
+        return
+    labels[:] = [other for other in labels if not dominates(label, other)]
+    labels.append(label)
+
+
+def pareto(itineraries):
+    """Itineraries not beaten on both fare and total travel time, cheapest first."""
+    best = []
+    for itinerary in sorted(itineraries, key=lambda i: (i.fare, i.arrive - i.start, len(i.legs))):
+        duration = itinerary.arrive - itinerary.start
+        if not best or duration < best[-1].arrive - best[-1].start:
+            best.append(itinerary)
+    return best
+
+
+def serialise(itinerary, date):
+    midnight = datetime(date.year, date.month, date.day)
+    return {
+        'fare': itinerary.fare,
+        'stops': len(itinerary.legs) - 1,
+        'duration_minutes': itinerary.arrive - itinerary.start,
+        'legs': [{
+            'id': leg.flight.id,
+            'airline': leg.flight.airline,
+            'plane': leg.flight.plane,
+            'from': leg.flight.origin.code,
+            'to': leg.flight.destination.code,
+            'depart': (midnight + timedelta(minutes=leg.depart)).isoformat(),
+            'arrive': (midnight + timedelta(minutes=leg.arrive)).isoformat(),
+            'fare': leg.fare,
+        } for leg in itinerary.legs],
+    }
+
+
+def find_connections(origin, destination, date, seat, max_stops=MAX_STOPS):
+    itineraries = get_graph().search(origin, destination, date, seat, max_stops)
+    if not itineraries:
+        return {'cheapest': None, 'fastest': None, 'itineraries': []}
+    return {
+        'cheapest': serialise(itineraries[0], date),
+        'fastest': serialise(itineraries[-1], date),
+        'itineraries': [serialise(i, date) for i in itineraries[:MAX_ITINERARIES]],
+    }
+
+
+_graph = LazyIndex(ConnectionGraph.build, catalogue='flights')
+get_graph = _graph.get
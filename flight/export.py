@@ -0,0 +1,62 @@
+"""
+Bulk ticket export: many tickets' PDFs as one ZIP, streamed as it is built.
+
+zipfile writes to an unseekable stream using data descriptors, so each entry is passed
+on to the client as soon as it is written and only one file chunk is held in memory.
+"""
+import zipfile
+
+from .models import Ticket
+from . import pdf
+
+CHUNK_SIZE = 64 * 1024
+
+
+class Pipe:
+    """Write-only file object whose writes are collected until the next `drain()`."""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def user_tickets(user, refs=(), booked_from=None, booked_to=None):
+    """The user's tickets by ref and/or booking-date range, with everything the PDF shows, in two queries."""
+    tickets = Ticket.objects.filter(user=user)
+    if refs:
+        tickets = tickets.filter(ref_no__in=refs)
+    if booked_from:
+        tickets = tickets.filter(booking_date__date__gte=booked_from)
+    if booked_to:
+        tickets = tickets.filter(booking_date__date__lte=booked_to)
+    return (tickets.select_related('flight__origin', 'flight__destination')
+            .prefetch_related('passengers').order_by('booking_date', 'id'))
+
+
+def zip_stream(tickets):
+    pipe = Pipe()
+    failed = []
+    with zipfile.ZipFile(pipe, 'w', zipfile.ZIP_STORED) as archive:
+        for ticket, path in pdf.render_many(tickets):
+            if path is None:
+                failed.append(ticket.ref_no)
+                continue
+            with open(path, 'rb') as source, archive.open(f'ticket-{ticket.ref_no}.pdf', 'w') as entry:
+                while chunk := source.read(CHUNK_SIZE):
+                    entry.write(chunk)
+                    yield pipe.drain()
+            yield pipe.drain()
+        if failed:
+            archive.writestr('FAILED.txt', "Could not render:\n" + "\n".join(failed) + "\n")
+    yield pipe.drain()
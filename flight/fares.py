@@ -0,0 +1,92 @@
+"""
+Maintenance of the RouteFareSummary table.
+
+Rows are keyed by (origin, destination, weekday, cabin). A saved or deleted flight only
+refreshes the route weekdays it ran on before and after the change; `rebuild()` recomputes the
+whole table, e.g. after a bulk catalogue load that bypasses model signals.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+
+from .models import Flight, RouteFareSummary
+from .timetable import SEAT_CLASSES
+
+FARE_FIELDS = [f'{seat}_fare' for seat in SEAT_CLASSES]
+
+
+def percentile(fares, p):
+    """Linearly interpolated p-th percentile (0-100) of an ascending, non-empty list."""
+    position = (len(fares) - 1) * p / 100
+    lower = int(position)
+    upper = min(lower + 1, len(fares) - 1)
+    return fares[lower] + (fares[upper] - fares[lower]) * (position - lower)
+
+
+def summarise(origin_id, destination_id, weekday, seat, fares):
+    fares = sorted(fares)
+    return RouteFareSummary(
+        origin_id=origin_id, destination_id=destination_id, weekday=weekday, seat_class=seat,
+        flight_count=len(fares), min_fare=fares[0], p25_fare=percentile(fares, 25),
+        median_fare=percentile(fares, 50), p75_fare=percentile(fares, 75), max_fare=fares[-1],
+    )
+
+
+def route_days(origin_id, destination_id, operating_days):
+    return {(origin_id, destination_id, weekday) for weekday in range(7) if operating_days & (1 << weekday)}
+
+
+def collect(rows):
+    """Group (origin_id, destination_id, operating_days, *fares) rows into fares per summary key."""
+    fares = defaultdict(list)
+    for origin_id, destination_id, operating_days, *values in rows:
+        for weekday in range(7):
+            if operating_days & (1 << weekday):
+                for seat, fare in zip(SEAT_CLASSES, values):
+                    if fare:
+                        fares[(origin_id, destination_id, weekday, seat)].append(fare)
+    return fares
+
+
+def refresh(days):
+    """
+    Recompute the summary rows of the given (origin_id, destination_id, weekday) triples.
+    Returns the number of routes refreshed.
+    """
+    weekdays = defaultdict(set)
+    for origin_id, destination_id, weekday in days:
+        weekdays[(origin_id, destination_id)].add(weekday)
+    with transaction.atomic():
+        for (origin_id, destination_id), route_weekdays in weekdays.items():
+            rows = (
+                Flight.objects.active().filter(origin_id=origin_id, destination_id=destination_id)
+                .values_list('origin_id', 'destination_id', 'operating_days', *FARE_FIELDS)
+            )
+            fares = {key: values for key, values in collect(rows).items() if key[2] in route_weekdays}
+            RouteFareSummary.objects.filter(
+                origin_id=origin_id, destination_id=destination_id, weekday__in=route_weekdays,
+            ).delete()
+            RouteFareSummary.objects.bulk_create([summarise(*key, values) for key, values in fares.items()])
+    return len(weekdays)
+
+
+def rebuild(batch_size=1000):
+    """Replace the whole summary table; returns the number of rows written."""
+    rows = Flight.objects.active().values_list('origin_id', 'destination_id', 'operating_days', *FARE_FIELDS)
+    summaries = [summarise(*key, fares) for key, fares in collect(rows).items()]
+    with transaction.atomic():
+        RouteFareSummary.objects.all().delete()
+        RouteFareSummary.objects.bulk_create(summaries, batch_size=batch_size)
+    return len(summaries)
+
+
+def fare_calendar(origin, destination, seat, start, end):
+    """Cheapest fare for each date from `start` to `end` inclusive; None where the route doesn't fly."""
+    by_weekday = dict(
+        RouteFareSummary.objects.filter(
+            origin__code=origin.upper(), destination__code=destination.upper(), seat_class=(seat or '').lower(),
+        ).values_list('weekday', 'min_fare')
+    )
+    days = (end - start).days + 1
+    return [(day, by_weekday.get(day.weekday())) for day in (start + timedelta(days=i) for i in range(days))]
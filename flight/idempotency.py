@@ -0,0 +1,132 @@
+"""
+Idempotency keys for POSTs that create or confirm bookings.
+
+A client sends an `Idempotency-Key` header, or the `idempotency_key` form field that the
+{% idempotency_field %} tag renders into a form. The first request with a key claims an
+IdempotencyKey row and, when it succeeds, its response is kept there next to a fingerprint of
+the request; a retry with the same key and payload gets that response back, headers and cookies
+included, without running the view again. The unique key column makes the claim atomic for every
+worker sharing the database, which a per-process cache could not. Only successful (2xx/3xx)
+responses are kept: after an error the key is released so the client can retry for real. A retry
+that arrives while the first is still running gets 409, and reusing a key for a different payload
+gets 422. Claims older than LOCK_TIMEOUT and responses older than TTL lapse; `purge` deletes them.
+"""
+import hashlib
+import uuid
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+TTL = getattr(settings, 'IDEMPOTENCY_TTL', 24 * 60 * 60)
+LOCK_TIMEOUT = getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 60)
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+FIELD = 'idempotency_key'
+IGNORED_FIELDS = {FIELD, 'csrfmiddlewaretoken'}
+
+
+def new_key():
+    return uuid.uuid4().hex
+
+
+def request_key(request):
+    return request.META.get(HEADER) or request.POST.get(FIELD)
+
+
+def fingerprint(request):
+    digest = hashlib.sha256(request.path.encode())
+    for name in sorted(set(request.POST) - IGNORED_FIELDS):
+        for value in request.POST.getlist(name):
+            digest.update(f'\0{name}={value}'.encode())
+    return digest.hexdigest()
+
+
+def store_key(request, key):
+    owner = request.user.pk if request.user.is_authenticated else 'anonymous'
+    return f"{owner}:{hashlib.sha1(key.encode()).hexdigest()}"
+
+
+def lapsed(now):
+    """Claims whose request has presumably died, and responses past their TTL."""
+    return (Q(status__isnull=True, created__lt=now - timedelta(seconds=LOCK_TIMEOUT))
+            | Q(status__isnull=False, created__lt=now - timedelta(seconds=TTL)))
+
+
+def claim(key, request_print):
+    """None once this request holds `key`; otherwise the live row of the request that got there first."""
+    while True:
+        now = timezone.now()
+        stored = IdempotencyKey.objects.filter(key=key).first()
+        if stored is None:
+            try:
+                with transaction.atomic():
+                    IdempotencyKey.objects.create(key=key, fingerprint=request_print, created=now)
+                return None
+            except IntegrityError:
+                continue    # another worker claimed it in between
+        if now - stored.created < timedelta(seconds=LOCK_TIMEOUT if stored.status is None else TTL):
+            return stored
+        # Take the lapsed row over, unless another request just did.
+        if IdempotencyKey.objects.filter(pk=stored.pk, created=stored.created).update(
+            fingerprint=request_print, status=None, headers=[], cookies=[], content=b'', created=now,
+        ):
+            return None
+
+
+def purge(now=None):
+    """Delete lapsed claims and responses; returns how many were deleted."""
+    return IdempotencyKey.objects.filter(lapsed(now or timezone.now())).delete()[0]
+
+
+def replay(stored):
+    response = HttpResponse(bytes(stored.content), status=stored.status)
+    for name, value in stored.headers:
+        response[name] = value
+    for name, value, attributes in stored.cookies:
+        response.cookies[name] = value
+        response.cookies[name].update(attributes)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request_key(request) if request.method == 'POST' else None
+        if not key:
+            return view(request, *args, **kwargs)
+
+        key, request_print = store_key(request, key), fingerprint(request)
+        stored = claim(key, request_print)
+        if stored is not None:
+            if stored.status is None:
+                return JsonResponse({'error': "A request with this idempotency key is in progress."}, status=409)
+            if stored.fingerprint != request_print:
+                return JsonResponse({'error': "This idempotency key was used for a different request."}, status=422)
+            return replay(stored)
+
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            IdempotencyKey.objects.filter(key=key, status__isnull=True).delete()
+            raise
+        if response.status_code >= 400 or response.streaming:
+            IdempotencyKey.objects.filter(key=key, status__isnull=True).delete()   # let the client retry for real
+        else:
+            IdempotencyKey.objects.filter(key=key, status__isnull=True).update(
+                status=response.status_code,
+                headers=list(response.items()),
+                cookies=[
+                    (name, morsel.value, {attribute: value for attribute, value in morsel.items() if value})
+                    for name, morsel in response.cookies.items()
+                ],
+                content=response.content,
+            )
+        return response
+    return wrapper
@@ -0,0 +1,110 @@
+"""
+Seat inventory per (flight, date, cabin).
+
+Seats are taken with a single conditional UPDATE (reserved + n <= capacity), so two
+requests racing for the last seats cannot both succeed whichever worker or database
+connection they run on. A PENDING ticket holds its seats until `hold_expires`; they go
+back to the inventory when the ticket is cancelled or its hold lapses.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import ticketdata
+from .models import SeatInventory, Ticket
+
+HOLD_MINUTES = getattr(settings, 'SEAT_HOLD_MINUTES', 15)
+CAPACITY = {'economy': 150, 'business': 30, 'first': 8, **getattr(settings, 'SEAT_CAPACITY', {})}
+
+
+class SoldOut(Exception):
+    pass
+
+
+def hold_expiry():
+    return timezone.now() + timedelta(minutes=HOLD_MINUTES)
+
+
+def inventory(flight, date, seat_class):
+    row, _ = SeatInventory.objects.get_or_create(
+        flight=flight, date=date, seat_class=seat_class, defaults={'capacity': CAPACITY[seat_class]},
+    )
+    return row
+
+
+def take(flight, date, seat_class, seats):
+    return SeatInventory.objects.filter(
+        flight=flight, date=date, seat_class=seat_class, reserved__lte=F('capacity') - seats,
+    ).update(reserved=F('reserved') + seats)
+
+
+def reserve(flight, date, seat_class, seats):
+    """
+    Take `seats` seats or raise SoldOut. The common case is one UPDATE; the inventory row is created on
+    first use, and lapsed holds on it are released before giving up.
+    """
+    seat_class = seat_class.lower()
+    if take(flight, date, seat_class, seats):
+        return
+    inventory(flight, date, seat_class)
+    if take(flight, date, seat_class, seats):
+        return
+    expire_holds(flight=flight, flight_ddate=date, seat_class=seat_class)
+    if not take(flight, date, seat_class, seats):
+        raise SoldOut(f"Not enough {seat_class} seats left on this flight.")
+
+
+def give_back(ticket_rows):
+    """Return the seats of (flight_id, flight_ddate, seat_class, seat_count) rows to the inventory."""
+    for flight_id, date, seat_class, seats in ticket_rows:
+        if seats:
+            SeatInventory.objects.filter(flight_id=flight_id, date=date, seat_class=seat_class).update(
+                reserved=F('reserved') - seats
+            )
+
+
+def close(tickets, status, skip_locked=False):
+    """
+    Move the still-active tickets in `tickets` to `status` and release their seats.
+    The tickets are row-locked first, so a ticket racing through two closes releases its seats once;
+    with `skip_locked`, tickets another transaction holds (e.g. mid-payment) are left for later.
+    """
+    with transaction.atomic():
+        tickets = tickets.filter(status__in=['PENDING', 'CONFIRMED'], seat_count__gt=0)
+        locked = tickets.select_for_update(skip_locked=skip_locked)
+        rows = list(locked.values_list('id', 'ref_no', 'flight_id', 'flight_ddate', 'seat_class', 'seat_count'))
+        if not rows:
+            return 0
+        closed = tickets.filter(id__in=[row[0] for row in rows]).update(
+            status=status, seat_count=0, hold_expires=None,
+        )
+        give_back(row[2:] for row in rows)
+        ticketdata.forget(*(row[1] for row in rows))
+    return closed
+
+
+def cancel(ticket):
+    if close(Ticket.objects.filter(pk=ticket.pk), 'CANCELLED'):
+        return
+    # A ticket holding no seats (booked before inventory existed) still gets cancelled.
+    if Ticket.objects.filter(pk=ticket.pk).exclude(status='CANCELLED').update(status='CANCELLED', hold_expires=None):
+        ticketdata.forget(ticket.ref_no)
+
+
+def expire_holds(now=None, **filters):
+    """Expire PENDING tickets whose hold has lapsed, releasing their seats; returns how many were expired."""
+    now = now or timezone.now()
+    return close(Ticket.objects.filter(status='PENDING', hold_expires__lt=now, **filters), 'EXPIRED')
+
+
+def confirm(ticket):
+    """Mark a PENDING ticket CONFIRMED; False if it was cancelled or expired in the meantime."""
+    confirmed = Ticket.objects.filter(pk=ticket.pk, status='PENDING').update(
+        status='CONFIRMED', hold_expires=None, booking_date=timezone.now(),
+    )
+    if confirmed:
+        ticketdata.forget(ticket.ref_no)
+    return bool(confirmed)
@@ -0,0 +1,60 @@
+"""
+Django management command to compare per-request latency with and without persistent database connections
+"""
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from flight.models import Place, Ticket
+
+
+class Command(BaseCommand):
+    help = ('Replay a simulated request cycle (connection check, two small queries, connection release) '
+            'with CONN_MAX_AGE=0 and with a persistent connection, and report the latency of each')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per configuration')
+        parser.add_argument('--max-age', type=int, default=600, help='CONN_MAX_AGE for the persistent run')
+        parser.add_argument('--no-health-checks', action='store_true', help='Disable CONN_HEALTH_CHECKS for the persistent run')
+
+    def request(self):
+        # Django runs close_old_connections on request_started and request_finished.
+        close_old_connections()
+        Place.objects.filter(code='DEL').exists()
+        Ticket.objects.filter(ref_no='000000').exists()
+        close_old_connections()
+
+    def run(self, requests, max_age, health_checks):
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+        connection.settings_dict['CONN_HEALTH_CHECKS'] = health_checks
+        timings = []
+        for _ in range(requests):
+            started = time.perf_counter()
+            self.request()
+            timings.append((time.perf_counter() - started) * 1000)
+        connection.close()
+        timings.sort()
+        return {
+            'mean': statistics.fmean(timings),
+            'p50': timings[len(timings) // 2],
+            'p95': timings[int(len(timings) * 0.95)],
+        }
+
+    def handle(self, *args, **options):
+        original = {key: connection.settings_dict.get(key) for key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+        try:
+            self.request()  # warm imports and caches
+            fresh = self.run(options['requests'], 0, False)
+            reused = self.run(options['requests'], options['max_age'], not options['no_health_checks'])
+        finally:
+            connection.settings_dict.update(original)
+
+        self.stdout.write(f"{connection.vendor} at {connection.settings_dict.get('HOST') or connection.settings_dict['NAME']}")
+        for label, stats in (('new connection per request', fresh), (f"CONN_MAX_AGE={options['max_age']}", reused)):
+            self.stdout.write(f"{label:>28}: mean {stats['mean']:.3f}ms  p50 {stats['p50']:.3f}ms  p95 {stats['p95']:.3f}ms")
+        self.stdout.write(self.style.SUCCESS(
+            f"Persistent connections save {fresh['mean'] - reused['mean']:.3f}ms per request on average."
+        ))
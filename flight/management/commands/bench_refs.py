@@ -0,0 +1,57 @@
+"""
+Django management command to measure ticket reference allocation throughput under concurrent workers
+"""
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from flight.models import RefSequence
+from flight.refs import BLOCK_SIZE, RefAllocator
+
+SEQUENCE = 'benchmark'
+
+
+class Command(BaseCommand):
+    help = 'Allocate ticket references from several threads, each acting as a separate worker, and report the rate'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent allocators')
+        parser.add_argument('--count', type=int, default=5000, help='References allocated per worker')
+        parser.add_argument('--block-size', type=int, default=BLOCK_SIZE, help='Counter values claimed per round trip')
+
+    def handle(self, *args, **options):
+        workers, count = options['workers'], options['count']
+        # Its own sequence row, so the benchmark never consumes real ticket references.
+        RefSequence.objects.filter(name=SEQUENCE).delete()
+        results = [[] for _ in range(workers)]
+        barrier = threading.Barrier(workers + 1)
+
+        def work(refs):
+            allocator = RefAllocator(SEQUENCE, options['block_size'])
+            try:
+                barrier.wait()
+                refs.extend(allocator.next() for _ in range(count))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=work, args=(refs,)) for refs in results]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        RefSequence.objects.filter(name=SEQUENCE).delete()
+        refs = [ref for worker in results for ref in worker]
+        if len(refs) != workers * count:
+            raise CommandError(f"Only {len(refs)} of {workers * count} references were allocated.")
+        if len(set(refs)) != len(refs):
+            raise CommandError(f"{len(refs) - len(set(refs))} duplicate references were allocated.")
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(refs)} unique references from {workers} workers in {elapsed:.2f}s "
+            f"({len(refs) / elapsed:.0f}/sec, block size {options['block_size']})"
+        ))
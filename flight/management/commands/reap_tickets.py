@@ -0,0 +1,41 @@
+"""
+Django management command to expire abandoned PENDING tickets and release their seats
+"""
+from django.core.management.base import BaseCommand
+
+from flight import reaper
+
+
+class Command(BaseCommand):
+    help = 'Mark PENDING tickets whose seat hold has lapsed as EXPIRED, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=reaper.BATCH_SIZE,
+            help='Tickets expired per transaction',
+        )
+        parser.add_argument(
+            '--lock-timeout',
+            type=int,
+            default=reaper.LOCK_TIMEOUT,
+            help='Milliseconds to wait for a row lock before giving up on a batch (PostgreSQL)',
+        )
+        parser.add_argument(
+            '--loop',
+            type=int,
+            metavar='SECONDS',
+            help='Keep running, reaping every SECONDS seconds',
+        )
+
+    def handle(self, *args, **options):
+        reap_options = {'batch_size': options['batch_size'], 'lock_timeout': options['lock_timeout']}
+        if options['loop']:
+            self.stdout.write(f"Reaping every {options['loop']}s; Ctrl-C to stop.")
+            try:
+                reaper.run_forever(options['loop'], **reap_options)
+            except KeyboardInterrupt:
+                pass
+        else:
+            self.stdout.write(self.style.SUCCESS(reaper.report(reaper.reap(**reap_options))))
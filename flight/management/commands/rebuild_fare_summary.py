@@ -0,0 +1,27 @@
+"""
+Django management command to recompute the route fare summary table from the flights
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from flight import fares
+
+
+class Command(BaseCommand):
+    help = 'Recompute RouteFareSummary (min/percentile/max fares per route, weekday and cabin)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per bulk INSERT statement',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = fares.rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {count} route fare summaries in {time.perf_counter() - started:.2f}s.'
+        ))
@@ -0,0 +1,79 @@
+"""
+Django management command to seed weekdays, airports and flights from Data/
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from flight import catalogue, fares
+from flight.models import RouteFareSummary
+from flight.utils import (
+    BATCH_SIZE, DOMESTIC_FLIGHTS_CSV, INTERNATIONAL_FLIGHTS_CSV,
+    addPlaces, createWeekDays, load_flights, report,
+)
+
+CATALOGS = ['weeks', 'places', 'flights']
+
+
+class Command(BaseCommand):
+    help = 'Insert or update weekdays, airports and flights from the CSV files in Data/'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only',
+            action='append',
+            choices=CATALOGS,
+            help='Seed only this catalogue (may be repeated)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Rows per bulk INSERT/UPDATE statement',
+        )
+        parser.add_argument(
+            '--sync',
+            action='store_true',
+            help='Also retire flights that are no longer in the schedule files',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would change and roll everything back',
+        )
+
+    def handle(self, *args, **options):
+        only = options['only'] or CATALOGS
+        batch_size = options['batch_size']
+        changed = set()
+
+        with transaction.atomic():
+            if 'weeks' in only:
+                self.stdout.write(report('Weekdays', createWeekDays(batch_size)))
+            if 'places' in only:
+                stats = addPlaces(batch_size=batch_size)
+                self.stdout.write(report('Airports', stats))
+                if stats['created'] or stats['updated']:
+                    # Search results embed place names, so the flights catalogue moves on too.
+                    changed |= {'places', 'flights'}
+            if 'flights' in only:
+                stats = load_flights(
+                    [DOMESTIC_FLIGHTS_CSV, INTERNATIONAL_FLIGHTS_CSV], batch_size, retire_missing=options['sync'],
+                )
+                self.stdout.write(report('Flights', stats))
+                if stats['fare_days']:
+                    changed.add('flights')
+                    # Bulk writes skip the Flight signals that keep the fare summary current.
+                    if RouteFareSummary.objects.exists():
+                        self.stdout.write(f"Route fare summaries: {fares.refresh(stats['fare_days'])} routes refreshed")
+                    else:
+                        self.stdout.write(f'Route fare summaries: {fares.rebuild(batch_size)} rebuilt')
+            if options['dry_run']:
+                transaction.set_rollback(True)
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry run: no changes were saved.'))
+            return
+        # Bumping a version throws away every process's derived caches, so only do it for a real change.
+        for name in sorted(changed):
+            catalogue.bump(name)
+        self.stdout.write(self.style.SUCCESS('Catalogue is up to date.'))
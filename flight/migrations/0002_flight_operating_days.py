@@ -0,0 +1,48 @@
+# Generated by Django 4.2.16 on 2026-10-16 20:48
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def days_to_mask(apps, schema_editor):
+    Flight = apps.get_model('flight', 'Flight')
+    masks = defaultdict(int)
+    for flight_id, number in Flight.depart_day.through.objects.values_list('flight_id', 'week__number'):
+        masks[flight_id] |= 1 << number
+    flights = [Flight(id=flight_id, operating_days=mask) for flight_id, mask in masks.items()]
+    Flight.objects.bulk_update(flights, ['operating_days'], batch_size=500)
+
+
+def mask_to_days(apps, schema_editor):
+    Flight = apps.get_model('flight', 'Flight')
+    Week = apps.get_model('flight', 'Week')
+    weeks = dict(Week.objects.values_list('number', 'id'))
+    Through = Flight.depart_day.through
+    rows = []
+    for flight_id, mask in Flight.objects.values_list('id', 'operating_days'):
+        rows.extend(
+            Through(flight_id=flight_id, week_id=weeks[number])
+            for number in range(7) if mask & (1 << number) and number in weeks
+        )
+    Through.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='operating_days',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(days_to_mask, mask_to_days),
+        migrations.RemoveField(
+            model_name='flight',
+            name='depart_day',
+        ),
+    ]
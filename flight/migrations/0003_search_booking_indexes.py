@@ -0,0 +1,34 @@
+# Generated by Django 4.2.16 on 2026-10-16 20:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight', '0002_flight_operating_days'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='place',
+            name='code',
+            field=models.CharField(max_length=3, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['origin', 'destination', 'economy_fare'], name='flight_route_economy_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['origin', 'destination', 'business_fare'], name='flight_route_business_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='flight',
+            index=models.Index(fields=['origin', 'destination', 'first_fare'], name='flight_route_first_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['user', '-booking_date'], name='ticket_user_booked_idx'),
+        ),
+    ]
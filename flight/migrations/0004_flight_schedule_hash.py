@@ -0,0 +1,42 @@
+# Generated by Django 4.2.16 on 2026-10-16 21:02
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def fill_schedule_hash(apps, schema_editor):
+    Flight = apps.get_model('flight', 'Flight')
+    rows = Flight.objects.values_list(
+        'id', 'plane', 'origin__code', 'destination__code', 'operating_days', 'depart_time', 'arrival_time',
+    )
+    flights = []
+    for flight_id, plane, origin, destination, operating_days, depart_time, arrival_time in rows:
+        # Same key as flight.models.schedule_hash at the time of this migration.
+        key = '|'.join([
+            plane, origin, destination, str(operating_days),
+            depart_time.strftime('%H:%M'), arrival_time.strftime('%H:%M'),
+        ])
+        flights.append(Flight(id=flight_id, schedule_hash=hashlib.sha1(key.encode()).hexdigest()))
+    Flight.objects.bulk_update(flights, ['schedule_hash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight', '0003_search_booking_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flight',
+            name='retired',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='flight',
+            name='schedule_hash',
+            field=models.CharField(blank=True, db_index=True, max_length=40),
+        ),
+        migrations.RunPython(fill_schedule_hash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.16 on 2026-10-16 20:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight', '0004_flight_schedule_hash'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='ticket',
+            name='ticket_user_booked_idx',
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['user', '-booking_date', '-id'], name='ticket_user_booked_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.16 on 2026-10-16 21:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight', '0005_ticket_bookings_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RouteFareSummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField()),
+                ('seat_class', models.CharField(max_length=20)),
+                ('flight_count', models.PositiveIntegerField()),
+                ('min_fare', models.FloatField()),
+                ('p25_fare', models.FloatField()),
+                ('median_fare', models.FloatField()),
+                ('p75_fare', models.FloatField()),
+                ('max_fare', models.FloatField()),
+                ('destination', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='flight.place')),
+                ('origin', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='flight.place')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='routefaresummary',
+            constraint=models.UniqueConstraint(fields=('origin', 'destination', 'weekday', 'seat_class'), name='route_fare_summary_key'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.16 on 2026-10-16 21:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight', '0006_route_fare_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='hold_expires',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='seat_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='SeatInventory',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('seat_class', models.CharField(choices=[('economy', 'Economy'), ('business', 'Business'), ('first', 'First')], max_length=20)),
+                ('capacity', models.PositiveSmallIntegerField()),
+                ('reserved', models.PositiveSmallIntegerField(default=0)),
+                ('flight', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory', to='flight.flight')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='seatinventory',
+            constraint=models.UniqueConstraint(fields=('flight', 'date', 'seat_class'), name='seat_inventory_key'),
+        ),
+        migrations.AddConstraint(
+            model_name='seatinventory',
+            constraint=models.CheckConstraint(check=models.Q(('reserved__lte', models.F('capacity'))), name='seat_inventory_not_overbooked'),
+        ),
+    ]
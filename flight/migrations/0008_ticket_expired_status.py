@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-16 21:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight', '0007_seat_inventory'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ticket',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('CONFIRMED', 'Confirmed'), ('CANCELLED', 'Cancelled'), ('EXPIRED', 'Expired')], max_length=45),
+        ),
+    ]
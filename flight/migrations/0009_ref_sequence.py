@@ -0,0 +1,21 @@
+# Generated by Django 4.2.16 on 2026-10-16 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight', '0008_ticket_expired_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RefSequence',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=32, unique=True)),
+                ('next_value', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.16 on 2026-10-17 09:12
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count, Sum
+
+# flight.inventory.CAPACITY as of this migration.
+CAPACITY = {'economy': 150, 'business': 30, 'first': 8, **getattr(settings, 'SEAT_CAPACITY', {})}
+
+
+def backfill(apps, schema_editor):
+    """
+    Count the seats of tickets booked before seat inventory existed, then recompute every
+    inventory row from the PENDING and CONFIRMED tickets, so an already full flight stays full.
+    """
+    Ticket = apps.get_model('flight', 'Ticket')
+    SeatInventory = apps.get_model('flight', 'SeatInventory')
+    active = Ticket.objects.filter(
+        status__in=['PENDING', 'CONFIRMED'], flight__isnull=False, flight_ddate__isnull=False,
+    )
+
+    legacy = active.filter(seat_count=0).annotate(seats=Count('passengers')).filter(seats__gt=0)
+    tickets = [Ticket(id=ticket_id, seat_count=seats) for ticket_id, seats in legacy.values_list('id', 'seats')]
+    Ticket.objects.bulk_update(tickets, ['seat_count'], batch_size=500)
+
+    reserved = {
+        (row['flight_id'], row['flight_ddate'], row['seat_class']): row['seats']
+        for row in active.values('flight_id', 'flight_ddate', 'seat_class').annotate(seats=Sum('seat_count'))
+    }
+    rows = {(row.flight_id, row.date, row.seat_class): row for row in SeatInventory.objects.all()}
+    creates = []
+    for key, seats in reserved.items():
+        if key[2] not in CAPACITY:
+            continue
+        row = rows.get(key)
+        if row is None:
+            creates.append(SeatInventory(
+                flight_id=key[0], date=key[1], seat_class=key[2],
+                capacity=max(CAPACITY[key[2]], seats), reserved=seats,
+            ))
+        else:
+            row.capacity, row.reserved = max(row.capacity, seats), seats
+    for key, row in rows.items():
+        if key not in reserved:
+            row.reserved = 0
+    SeatInventory.objects.bulk_update(rows.values(), ['capacity', 'reserved'], batch_size=500)
+    SeatInventory.objects.bulk_create(creates, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight', '0009_ref_sequence'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.16 on 2026-10-17 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('flight', '0010_backfill_seat_inventory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdempotencyKey',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=96, unique=True)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('status', models.PositiveSmallIntegerField(null=True)),
+                ('headers', models.JSONField(default=list)),
+                ('cookies', models.JSONField(default=list)),
+                ('content', models.BinaryField(default=b'')),
+                ('created', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 
+import hashlib
 from datetime import datetime
 
 # Create your models here.
@@ -12,7 +13,7 @@ class User(AbstractUser):
 class Place(models.Model):
     city = models.CharField(max_length=64)
     airport = models.CharField(max_length=64)
-    code = models.CharField(max_length=3)
+    code = models.CharField(max_length=3, unique=True)
     country = models.CharField(max_length=64)
 
     def __str__(self):
@@ -27,11 +28,40 @@ class Week(models.Model):
         return f"{self.name} ({self.number})"
 
 
+def weekday_mask(*weekdays):
+    """Bitmask with bit n set for each weekday number n (0 = Monday, as in Week.number)."""
+    mask = 0
+    for weekday in weekdays:
+        mask |= 1 << weekday
+    return mask
+
+
+def schedule_hash(flight_no, origin, destination, operating_days, depart_time, arrival_time):
+    """Identity of a scheduled flight; a change to any of these makes it a different flight."""
+    key = '|'.join([
+        flight_no, origin, destination, str(operating_days),
+        depart_time.strftime('%H:%M'), arrival_time.strftime('%H:%M'),
+    ])
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+class FlightQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(retired=False)
+
+    def with_places(self):
+        return self.select_related('origin', 'destination')
+
+    def operating_on(self, weekday):
+        bit = weekday_mask(weekday)
+        return self.alias(runs_on=models.F('operating_days').bitand(bit)).filter(runs_on=bit)
+
+
 class Flight(models.Model):
     origin = models.ForeignKey(Place, on_delete=models.CASCADE, related_name="departures")
     destination = models.ForeignKey(Place, on_delete=models.CASCADE, related_name="arrivals")
     depart_time = models.TimeField(auto_now=False, auto_now_add=False)
-    depart_day = models.ManyToManyField(Week, related_name="flights_of_the_day")
+    operating_days = models.PositiveSmallIntegerField(default=0)   # weekday_mask() of the departure days
     duration = models.DurationField(null=True)
     arrival_time = models.TimeField(auto_now=False, auto_now_add=False)
     plane = models.CharField(max_length=24)
@@ -39,10 +69,57 @@ class Flight(models.Model):
     economy_fare = models.FloatField(null=True)
     business_fare = models.FloatField(null=True)
     first_fare = models.FloatField(null=True)
+    schedule_hash = models.CharField(max_length=40, blank=True, db_index=True)
+    retired = models.BooleanField(default=False)    # dropped from the schedule; kept for existing tickets
+
+    objects = FlightQuerySet.as_manager()
+
+    class Meta:
+        # One per cabin: search filters on the route and orders by that cabin's fare.
+        indexes = [
+            models.Index(fields=['origin', 'destination', 'economy_fare'], name='flight_route_economy_idx'),
+            models.Index(fields=['origin', 'destination', 'business_fare'], name='flight_route_business_idx'),
+            models.Index(fields=['origin', 'destination', 'first_fare'], name='flight_route_first_idx'),
+        ]
 
     def __str__(self):
         return f"{self.id}: {self.origin} to {self.destination}"
 
+    def save(self, *args, **kwargs):
+        self.schedule_hash = schedule_hash(
+            self.plane, self.origin.code, self.destination.code,
+            self.operating_days, self.depart_time, self.arrival_time,
+        )
+        super().save(*args, **kwargs)
+
+    @property
+    def weekdays(self):
+        return [day for day in range(7) if self.operating_days & (1 << day)]
+
+
+class RouteFareSummary(models.Model):
+    """Fare statistics of the active flights on a route, per departure weekday and cabin (see flight.fares)."""
+    origin = models.ForeignKey(Place, on_delete=models.CASCADE, related_name="+")
+    destination = models.ForeignKey(Place, on_delete=models.CASCADE, related_name="+")
+    weekday = models.PositiveSmallIntegerField()    # Week.number
+    seat_class = models.CharField(max_length=20)
+    flight_count = models.PositiveIntegerField()
+    min_fare = models.FloatField()
+    p25_fare = models.FloatField()
+    median_fare = models.FloatField()
+    p75_fare = models.FloatField()
+    max_fare = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['origin', 'destination', 'weekday', 'seat_class'], name='route_fare_summary_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.origin_id} to {self.destination_id} ({self.weekday}, {self.seat_class}): {self.min_fare}-{self.max_fare}"
+
 
 
 GENDER = (
@@ -71,7 +148,8 @@ SEAT_CLASS = (
 TICKET_STATUS =(
     ('PENDING', 'Pending'),
     ('CONFIRMED', 'Confirmed'),
-    ('CANCELLED', 'Cancelled')
+    ('CANCELLED', 'Cancelled'),
+    ('EXPIRED', 'Expired')      # PENDING past its seat hold, see flight.reaper
 )
 
 class Ticket(models.Model):
@@ -91,6 +169,54 @@ class Ticket(models.Model):
     mobile = models.CharField(max_length=20,blank=True)
     email = models.EmailField(max_length=45, blank=True)
     status = models.CharField(max_length=45, choices=TICKET_STATUS)
+    seat_count = models.PositiveSmallIntegerField(default=0)    # seats held in SeatInventory, 0 once released
+    hold_expires = models.DateTimeField(blank=True, null=True)  # a PENDING ticket's seats are released after this
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-booking_date', '-id'], name='ticket_user_booked_idx'),
+        ]
+
+    def __str__(self):
+        return self.ref_no
+
+
+class SeatInventory(models.Model):
+    """Seats sold or held on one flight, date and cabin; see flight.inventory."""
+    flight = models.ForeignKey(Flight, on_delete=models.CASCADE, related_name="inventory")
+    date = models.DateField()
+    seat_class = models.CharField(max_length=20, choices=SEAT_CLASS)
+    capacity = models.PositiveSmallIntegerField()
+    reserved = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['flight', 'date', 'seat_class'], name='seat_inventory_key'),
+            models.CheckConstraint(check=models.Q(reserved__lte=models.F('capacity')), name='seat_inventory_not_overbooked'),
+        ]
+
+    def __str__(self):
+        return f"{self.flight_id} on {self.date} ({self.seat_class}): {self.reserved}/{self.capacity}"
+
+
+class RefSequence(models.Model):
+    """Shared counter from which workers claim blocks of ticket references; see flight.refs."""
+    name = models.CharField(max_length=32, unique=True)
+    next_value = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.next_value}"
+
+
+class IdempotencyKey(models.Model):
+    """A request claimed under an idempotency key and, once it succeeded, its response; see flight.idempotency."""
+    key = models.CharField(max_length=96, unique=True)
+    fingerprint = models.CharField(max_length=64)
+    status = models.PositiveSmallIntegerField(null=True)   # null while the first request is still running
+    headers = models.JSONField(default=list)
+    cookies = models.JSONField(default=list)
+    content = models.BinaryField(default=b'')
+    created = models.DateTimeField(db_index=True)
 
     def __str__(self):
-        return self.ref_no
\ No newline at end of file
+        return f"{self.key}: {self.status or 'in progress'}"
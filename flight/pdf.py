@@ -0,0 +1,148 @@
+"""
+PDF tickets, rendered in a process pool and cached on disk by content.
+
+The ticket's HTML is cheap to render; its hash names the cached PDF
+(<TICKET_PDF_CACHE_DIR>/<ref>-<hash>.pdf) and doubles as the download's ETag. Any change
+that shows on the ticket (status, passengers, fares...) changes the hash, so a stale PDF
+is never served, and an unchanged ticket is a file read. The layout pass itself runs in
+worker processes so it neither blocks on nor competes for the request thread's GIL; the
+workers write the PDF to its cache path themselves, so its bytes never cross back.
+"""
+import hashlib
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+
+from django.conf import settings
+from django.template.loader import render_to_string
+
+from capstone import pdf as converter
+from .models import Ticket
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(getattr(settings, 'TICKET_PDF_CACHE_DIR', settings.BASE_DIR / 'pdf_cache'))
+WORKERS = getattr(settings, 'TICKET_PDF_WORKERS', 2)
+TIMEOUT = getattr(settings, 'TICKET_PDF_TIMEOUT', 30)
+WINDOW = getattr(settings, 'TICKET_PDF_WINDOW', 2 * WORKERS)     # renders queued ahead by render_many
+TEMPLATE = 'flight/ticket.html'
+
+_pool = None
+_lock = threading.Lock()
+_pending = {}   # cache path -> Future of the render, so concurrent requests share one
+
+
+class PDFUnavailable(Exception):
+    pass
+
+
+def available():
+    return converter.available()
+
+
+def load_ticket(ref):
+    return (Ticket.objects.select_related('flight__origin', 'flight__destination')
+            .prefetch_related('passengers').get(ref_no=ref))
+
+
+def ticket_html(ticket):
+    return render_to_string(TEMPLATE, {'ticket1': ticket, 'current_year': datetime.now().year})
+
+
+def content_hash(html):
+    return hashlib.sha256(html.encode()).hexdigest()[:32]
+
+
+def cache_path(ref, digest):
+    return CACHE_DIR / f'{ref}-{digest}.pdf'
+
+
+def pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=WORKERS)
+    return _pool
+
+
+def finished(path, job):
+    with _lock:
+        _pending.pop(path, None)
+
+
+def submit(path, html):
+    """Future that resolves to True once the ticket's PDF is at `path`, False if it could not be laid out."""
+    global _pool
+    with _lock:
+        job = _pending.get(path)
+        if job is None:
+            try:
+                job = pool().submit(converter.html_to_file, html, path)
+            except BrokenProcessPool:
+                _pool = None
+                job = pool().submit(converter.html_to_file, html, path)
+            _pending[path] = job
+            job.add_done_callback(partial(finished, path))
+    return job
+
+
+def render(ticket, html=None):
+    """Path of the ticket's PDF, rendering it in the pool unless the current version is cached."""
+    if not available():
+        raise PDFUnavailable("PDF tickets need xhtml2pdf installed.")
+    html = html or ticket_html(ticket)
+    path = cache_path(ticket.ref_no, content_hash(html))
+    if path.exists():
+        return path
+    if not submit(path, html).result(timeout=TIMEOUT):
+        raise PDFUnavailable(f"Could not lay out ticket {ticket.ref_no}.")
+    return path
+
+
+def start(ticket):
+    html = ticket_html(ticket)
+    path = cache_path(ticket.ref_no, content_hash(html))
+    return ticket, path, None if path.exists() else submit(path, html)
+
+
+def wait(ticket, path, job):
+    if job is not None:
+        try:
+            rendered = job.result(timeout=TIMEOUT)
+        except Exception:
+            logger.exception("Rendering %s failed", path.name)
+            rendered = False
+        if not rendered:
+            return ticket, None
+    return ticket, path
+
+
+def render_many(tickets, window=None):
+    """
+    Yield (ticket, path or None) in order; None marks a ticket that could not be rendered. Up to
+    `window` tickets are queued on the pool ahead of the one being yielded, so they are laid out in
+    parallel while each finished PDF stays on disk until the caller reads it.
+    """
+    if not available():
+        raise PDFUnavailable("PDF tickets need xhtml2pdf installed.")
+    window = window or WINDOW
+    jobs = deque()
+    for ticket in tickets:
+        jobs.append(start(ticket))
+        if len(jobs) >= window:
+            yield wait(*jobs.popleft())
+    while jobs:
+        yield wait(*jobs.popleft())
+
+
+def warm(ticket):
+    """Start rendering in the background, e.g. right after payment, so the first download is a file read."""
+    if available():
+        html = ticket_html(ticket)
+        path = cache_path(ticket.ref_no, content_hash(html))
+        if not path.exists():
+            submit(path, html)
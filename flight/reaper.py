@@ -0,0 +1,92 @@
+"""
+Expiry of abandoned checkouts.
+
+A PENDING ticket whose seat hold has lapsed (or, for tickets booked before seat holds,
+whose booking is older than the hold time) is marked EXPIRED and its seats go back to the
+inventory. Tickets are processed in id order in bounded batches, one short transaction
+each, so the reaper never holds many locks at once. Run it with `manage.py reap_tickets`, from
+cron or as a `--loop` worker process; it is never started from app initialisation.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import idempotency, inventory, ticketdata
+from .models import Ticket
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = getattr(settings, 'TICKET_REAPER_BATCH_SIZE', 500)
+LOCK_TIMEOUT = getattr(settings, 'TICKET_REAPER_LOCK_TIMEOUT', 2000)     # milliseconds
+
+
+def stale(now):
+    legacy_cutoff = now - timedelta(minutes=inventory.HOLD_MINUTES)
+    return Ticket.objects.filter(status='PENDING').filter(
+        Q(hold_expires__lt=now) | Q(hold_expires__isnull=True, booking_date__lt=legacy_cutoff)
+    )
+
+
+def set_lock_timeout(milliseconds):
+    # Only PostgreSQL takes a per-transaction lock timeout; elsewhere the connection's own timeout applies.
+    if milliseconds and connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL lock_timeout = %s", [f'{int(milliseconds)}ms'])
+
+
+def reap_batch(now, after_id, batch_size=BATCH_SIZE, lock_timeout=LOCK_TIMEOUT):
+    """Expire up to `batch_size` stale tickets with ids above `after_id`; returns (expired, last id seen)."""
+    with transaction.atomic():
+        set_lock_timeout(lock_timeout)
+        rows = list(stale(now).filter(id__gt=after_id).order_by('id').values_list('id', 'ref_no')[:batch_size])
+        if not rows:
+            return 0, None
+        ids = [row[0] for row in rows]
+        # Tickets locked by an in-flight payment are skipped rather than waited on, and the stale filter
+        # is applied again under the lock, so a payment that committed since the SELECT above keeps its ticket.
+        expired = inventory.close(stale(now).filter(id__in=ids), 'EXPIRED', skip_locked=True)
+        seatless = stale(now).filter(id__in=ids, seat_count=0).update(status='EXPIRED', hold_expires=None)
+        if seatless:
+            ticketdata.forget(*(row[1] for row in rows))
+        expired += seatless
+    return expired, ids[-1]
+
+
+def reap(batch_size=BATCH_SIZE, lock_timeout=LOCK_TIMEOUT, now=None):
+    """Expire every stale PENDING ticket and drop lapsed idempotency keys; returns counts and timing for reporting."""
+    now = now or timezone.now()
+    stats = {'expired': 0, 'batches': 0, 'started': time.perf_counter()}
+    after_id = 0
+    while True:
+        expired, after_id = reap_batch(now, after_id, batch_size, lock_timeout)
+        if after_id is None:
+            break
+        stats['expired'] += expired
+        stats['batches'] += 1
+    stats['keys_purged'] = idempotency.purge(now)
+    stats['elapsed'] = time.perf_counter() - stats['started']
+    return stats
+
+
+def report(stats):
+    return (f"Expired {stats['expired']} pending tickets in {stats['batches']} batches"
+            f" and purged {stats['keys_purged']} idempotency keys ({stats['elapsed']:.2f}s)")
+
+
+def run_forever(interval, stop=None, **options):
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        try:
+            logger.info(report(reap(**options)))
+        except Exception:
+            logger.exception("Ticket reaper pass failed")
+        finally:
+            close_old_connections()
+        stop.wait(interval)
+
@@ -0,0 +1,94 @@
+"""
+Ticket reference allocation.
+
+References stay six hex characters (a 24-bit space). Each one is a counter value passed
+through a keyed 4-round Feistel permutation of that space: distinct counters always give
+distinct references, yet consecutive bookings don't get guessable neighbouring refs.
+
+Workers claim counter values in blocks from a RefSequence row with one conditional UPDATE,
+so the database is touched once per block rather than once per ticket and nothing relies
+on the UNIQUE constraint failing and retrying. Tickets created before this scheme used
+random refs; those are skipped when a block is claimed.
+"""
+import hashlib
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from .models import RefSequence, Ticket
+
+BITS = 24
+HALF = BITS // 2
+MASK = (1 << HALF) - 1
+SPACE = 1 << BITS
+ROUNDS = 4
+BLOCK_SIZE = getattr(settings, 'TICKET_REF_BLOCK_SIZE', 64)
+# Changing the key once tickets exist would map new counters onto refs already issued.
+KEY = getattr(settings, 'TICKET_REF_KEY', settings.SECRET_KEY).encode()
+
+
+class RefsExhausted(Exception):
+    pass
+
+
+def round_keys(key=KEY):
+    return [hashlib.blake2b(bytes([i]), key=key[:64], digest_size=8).digest() for i in range(ROUNDS)]
+
+
+ROUND_KEYS = round_keys()
+
+
+def permute(n, keys=ROUND_KEYS):
+    """Bijection on [0, SPACE): a balanced Feistel network over two 12-bit halves."""
+    left, right = n >> HALF, n & MASK
+    for key in keys:
+        digest = hashlib.blake2b(right.to_bytes(2, 'big'), key=key, digest_size=2).digest()
+        left, right = right, left ^ (int.from_bytes(digest, 'big') & MASK)
+    return (left << HALF) | right
+
+
+def format_ref(n):
+    return f'{permute(n):06X}'
+
+
+class RefAllocator:
+    """Hands out references from a locally held block, claiming the next block when it runs out."""
+
+    def __init__(self, name='ticket', block_size=BLOCK_SIZE):
+        self.name = name
+        self.block_size = block_size
+        self.refs = deque()
+        self.lock = threading.Lock()
+
+    def claim_block(self):
+        """
+        Reserve the next `block_size` counter values. The claim commits on its own, so call this outside
+        any enclosing atomic block: a rolled-back claim could otherwise be handed out again.
+        """
+        # Write first: the UPDATE takes the row (or, on SQLite, database) lock before the read-back.
+        with transaction.atomic():
+            claimed = RefSequence.objects.filter(name=self.name).update(next_value=F('next_value') + self.block_size)
+            if claimed:
+                end = RefSequence.objects.values_list('next_value', flat=True).get(name=self.name)
+        if not claimed:
+            RefSequence.objects.get_or_create(name=self.name)
+            return self.claim_block()
+        start = end - self.block_size
+        if start >= SPACE:
+            raise RefsExhausted("Every ticket reference has been issued.")
+        refs = [format_ref(n) for n in range(start, min(end, SPACE))]
+        taken = set(Ticket.objects.filter(ref_no__in=refs).values_list('ref_no', flat=True))
+        return [ref for ref in refs if ref not in taken]
+
+    def next(self):
+        with self.lock:
+            while not self.refs:
+                self.refs.extend(self.claim_block())
+            return self.refs.popleft()
+
+
+allocator = RefAllocator()
+next_ref = allocator.next
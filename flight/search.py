@@ -0,0 +1,131 @@
+"""
+Faceted flight search evaluated in the database, backing the JSON search API.
+
+Filtering, sorting, facet counts and fare bounds are all computed with SQL
+aggregates, so the response only carries the page of flights being shown.
+"""
+from datetime import time
+
+from django.db.models import Count, Max, Min, Q
+
+from .models import Flight
+from .timetable import SEAT_CLASSES
+
+# Same buckets as the time-slot filters on the search page (hours, end exclusive).
+TIME_SLOTS = {
+    'morning': (0, 6),
+    'noon': (6, 12),
+    'evening': (12, 18),
+    'night': (18, 24),
+}
+
+SORTS = {
+    'price': ['{fare}', 'id'],
+    '-price': ['-{fare}', 'id'],
+    'departure': ['depart_time', '{fare}'],
+    'arrival': ['arrival_time', '{fare}'],
+    'duration': ['duration', '{fare}'],
+}
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+
+
+class SearchError(ValueError):
+    pass
+
+
+def slot_q(field, slot):
+    start, end = TIME_SLOTS[slot]
+    q = Q(**{f'{field}__gte': time(start)})
+    if end < 24:
+        q &= Q(**{f'{field}__lt': time(end)})
+    return q
+
+
+def slots_q(field, slots):
+    q = Q()
+    for slot in slots:
+        q |= slot_q(field, slot)
+    return q
+
+
+class FlightSearch:
+    def __init__(self, origin, destination, weekday, seat, min_price=None, max_price=None,
+                 departure_slots=(), arrival_slots=(), airlines=(), sort='price'):
+        seat = (seat or '').lower()
+        if seat not in SEAT_CLASSES:
+            raise SearchError(f"Unknown seat class: {seat}")
+        for slot in (*departure_slots, *arrival_slots):
+            if slot not in TIME_SLOTS:
+                raise SearchError(f"Unknown time slot: {slot}")
+        if sort not in SORTS:
+            raise SearchError(f"Unknown sort order: {sort}")
+        self.seat = seat
+        self.fare = f'{seat}_fare'
+        self.sort = sort
+        self.route = (
+            Flight.objects.active().operating_on(weekday)
+            .filter(origin__code=origin.upper(), destination__code=destination.upper())
+            .exclude(**{self.fare: 0}).exclude(**{f'{self.fare}__isnull': True})
+        )
+        # Each facet is counted with every filter except its own, so choosing one value doesn't hide the others.
+        self.filters = {
+            'price': Q(**{f'{self.fare}__gte': min_price}) if min_price is not None else Q(),
+            'departure': slots_q('depart_time', departure_slots),
+            'arrival': slots_q('arrival_time', arrival_slots),
+            'airline': Q(airline__in=airlines) if airlines else Q(),
+        }
+        if max_price is not None:
+            self.filters['price'] &= Q(**{f'{self.fare}__lte': max_price})
+
+    def filtered(self, *exclude):
+        q = Q()
+        for name, condition in self.filters.items():
+            if name not in exclude:
+                q &= condition
+        return self.route.filter(q)
+
+    def fare_bounds(self):
+        bounds = self.route.aggregate(min=Min(self.fare), max=Max(self.fare))
+        return {'min': bounds['min'] or 0, 'max': bounds['max'] or 0}
+
+    def slot_counts(self, field, facet):
+        return self.filtered(facet).aggregate(**{
+            slot: Count('id', filter=slot_q(field, slot)) for slot in TIME_SLOTS
+        })
+
+    def airline_counts(self):
+        rows = self.filtered('airline').values('airline').annotate(count=Count('id')).order_by('airline')
+        return {row['airline']: row['count'] for row in rows}
+
+    def facets(self):
+        return {
+            'departure': self.slot_counts('depart_time', 'departure'),
+            'arrival': self.slot_counts('arrival_time', 'arrival'),
+            'airline': self.airline_counts(),
+        }
+
+    def page(self, number=1, size=DEFAULT_PAGE_SIZE):
+        flights = self.filtered()
+        total = flights.count()
+        ordering = [field.format(fare=self.fare) for field in SORTS[self.sort]]
+        start = (number - 1) * size
+        rows = flights.order_by(*ordering).values(
+            'id', 'airline', 'plane', 'depart_time', 'arrival_time', 'duration', self.fare,
+            'origin__code', 'origin__city', 'destination__code', 'destination__city',
+        )[start:start + size]
+        return total, [self.serialise(row) for row in rows]
+
+    def serialise(self, row):
+        return {
+            'id': row['id'],
+            'airline': row['airline'],
+            'plane': row['plane'],
+            'origin': {'code': row['origin__code'], 'city': row['origin__city']},
+            'destination': {'code': row['destination__code'], 'city': row['destination__city']},
+            'depart_time': row['depart_time'].strftime('%H:%M'),
+            'arrival_time': row['arrival_time'].strftime('%H:%M'),
+            'duration_minutes': int(row['duration'].total_seconds() // 60) if row['duration'] else None,
+            'fare': row[self.fare],
+        }
@@ -0,0 +1,46 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+
+from .models import Flight, Place, Ticket
+from . import catalogue, fares, ticketdata
+
+
+def bump_places(**kwargs):
+    catalogue.bump('places')
+
+
+def bump_flights(**kwargs):
+    catalogue.bump('flights')
+
+
+def remember_fare_days(sender, instance, **kwargs):
+    # A flight moving route or weekdays leaves its old summary rows stale as well as its new ones.
+    instance._fare_days = set()
+    if instance.pk:
+        previous = Flight.objects.filter(pk=instance.pk).values_list('origin_id', 'destination_id', 'operating_days')
+        for row in previous:
+            instance._fare_days = fares.route_days(*row)
+
+
+def refresh_fares(sender, instance, **kwargs):
+    days = fares.route_days(instance.origin_id, instance.destination_id, instance.operating_days)
+    fares.refresh(days | getattr(instance, '_fare_days', set()))
+
+
+def forget_ticket(sender, instance, **kwargs):
+    ticketdata.forget(instance.ref_no)
+
+
+def connect():
+    # Search results embed place names, so a Place change also moves the flights catalogue on.
+    for model in (Flight, Place):
+        post_save.connect(bump_flights, sender=model, dispatch_uid=f'flights-version-save-{model.__name__}')
+        post_delete.connect(bump_flights, sender=model, dispatch_uid=f'flights-version-delete-{model.__name__}')
+    post_save.connect(bump_places, sender=Place, dispatch_uid='places-version-save')
+    post_delete.connect(bump_places, sender=Place, dispatch_uid='places-version-delete')
+
+    pre_save.connect(remember_fare_days, sender=Flight, dispatch_uid='route-fares-pre-save')
+    post_save.connect(refresh_fares, sender=Flight, dispatch_uid='route-fares-save')
+    post_delete.connect(refresh_fares, sender=Flight, dispatch_uid='route-fares-delete')
+
+    post_save.connect(forget_ticket, sender=Ticket, dispatch_uid='ticket-data-save')
+    post_delete.connect(forget_ticket, sender=Ticket, dispatch_uid='ticket-data-delete')
@@ -0,0 +1,84 @@
+"""
+Cached ticket status documents for /flight/ticket/api/<ref>.
+
+Each ref's JSON body and ETag live in the cache until the ticket changes: post_save and
+post_delete cover single saves, and the bulk UPDATEs in flight.inventory and flight.reaper
+(confirmation, cancellation, expiry) call `forget()` with the refs they changed. Entries are
+dropped only once the change has committed; dropping them earlier would let a poll racing
+the transaction cache the old row again. A poll for an unchanged ticket is answered from
+the cache, or with a 304, without a database query.
+
+Invalidation only reaches processes that share the cache. The settings configure a shared
+one; should the default cache be the per-process LocMemCache anyway, a change made in another
+worker or in reap_tickets can't drop this process's entries, so they live for LOCAL_TIMEOUT only.
+"""
+import hashlib
+import json
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from .models import Ticket
+
+TIMEOUT = getattr(settings, 'TICKET_DATA_CACHE_TIMEOUT', 60 * 60)
+LOCAL_TIMEOUT = getattr(settings, 'TICKET_DATA_LOCAL_CACHE_TIMEOUT', 5)
+
+
+def timeout():
+    if isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache):
+        return min(TIMEOUT, LOCAL_TIMEOUT)
+    return TIMEOUT
+
+
+def cache_key(ref):
+    return f"ticket-data:{ref}"
+
+
+def document(ticket):
+    data = {
+        'ref': ticket.ref_no,
+        'from': ticket.flight.origin.code,
+        'to': ticket.flight.destination.code,
+        'flight_date': ticket.flight_ddate,
+        'status': ticket.status
+    }
+    body = json.dumps(data, cls=DjangoJSONEncoder).encode()
+    return {
+        'etag': f'"{hashlib.sha1(body).hexdigest()}"', 'body': body, 'data': json.loads(body),
+        'user': ticket.user_id,
+    }
+
+
+def load(refs):
+    tickets = Ticket.objects.select_related('flight__origin', 'flight__destination').filter(ref_no__in=refs)
+    return {ticket.ref_no: document(ticket) for ticket in tickets}
+
+
+def get_many(refs):
+    """{ref: {'etag', 'body', 'data', 'user'}} for the refs that exist; cache misses are loaded in one query."""
+    keys = {cache_key(ref): ref for ref in refs}
+    found = {keys[key]: entry for key, entry in cache.get_many(keys).items()}
+    missing = [ref for ref in refs if ref not in found]
+    if missing:
+        loaded = load(missing)
+        cache.set_many({cache_key(ref): entry for ref, entry in loaded.items()}, timeout())
+        found.update(loaded)
+    return found
+
+
+def get(ref):
+    """{'etag', 'body', 'data', 'user'} for a ticket, or None if there is no such ticket."""
+    return get_many([ref]).get(ref)
+
+
+def invalidate(*refs):
+    cache.delete_many([cache_key(ref) for ref in refs if ref])
+
+
+def forget(*refs):
+    """Invalidate the refs' cached documents once the current transaction commits (at once outside one)."""
+    transaction.on_commit(partial(invalidate, *refs))
@@ -0,0 +1,104 @@
+"""
+Process-local timetable index used by the flight search page.
+
+The whole schedule is small enough (~13k rows) to keep in memory, so it is
+loaded once per worker and searches are answered from a dict keyed by
+(origin code, destination code, weekday, seat class) without touching the DB.
+"""
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+
+from . import catalogue
+from .catalogue import LazyIndex
+from .models import Flight, Place
+
+SEAT_CLASSES = ('economy', 'business', 'first')
+SEARCH_TIMEOUT = getattr(settings, 'SEARCH_CACHE_TIMEOUT', 10 * 60)
+
+PlaceRecord = namedtuple('PlaceRecord', ['id', 'code', 'city', 'airport', 'country'])
+
+FlightRecord = namedtuple('FlightRecord', [
+    'id', 'origin', 'destination', 'depart_time', 'duration', 'arrival_time',
+    'plane', 'airline', 'economy_fare', 'business_fare', 'first_fare',
+])
+
+
+def fare_of(flight, seat):
+    return getattr(flight, f'{seat}_fare')
+
+
+class Timetable:
+    def __init__(self, places, routes):
+        self.places = places    # code -> PlaceRecord
+        self.routes = routes    # (origin, destination, weekday, seat) -> tuple of FlightRecord, cheapest first
+
+    @classmethod
+    def build(cls):
+        places_by_id = {}
+        places = {}
+        for place in Place.objects.values_list('id', 'code', 'city', 'airport', 'country'):
+            record = PlaceRecord(*place)
+            places_by_id[record.id] = record
+            places[record.code.upper()] = record
+
+        routes = defaultdict(list)
+        rows = Flight.objects.active().values_list(
+            'id', 'origin_id', 'destination_id', 'depart_time', 'duration', 'arrival_time',
+            'plane', 'airline', 'economy_fare', 'business_fare', 'first_fare', 'operating_days',
+        )
+        for row in rows:
+            flight = FlightRecord(row[0], places_by_id[row[1]], places_by_id[row[2]], *row[3:-1])
+            operating_days = row[-1]
+            for weekday in range(7):
+                if not operating_days & (1 << weekday):
+                    continue
+                for seat in SEAT_CLASSES:
+                    if fare_of(flight, seat):
+                        routes[(flight.origin.code, flight.destination.code, weekday, seat)].append(flight)
+
+        for key, flights in routes.items():
+            seat = key[3]
+            routes[key] = tuple(sorted(flights, key=lambda f: (fare_of(f, seat), f.id)))
+        return cls(places, dict(routes))
+
+    def place(self, code):
+        try:
+            return self.places[(code or '').upper()]
+        except KeyError:
+            raise Http404(f"Unknown airport code: {code}")
+
+    def search(self, origin, destination, weekday, seat):
+        return self.routes.get((origin.upper(), destination.upper(), weekday, (seat or '').lower()), ())
+
+_timetable = LazyIndex(Timetable.build, catalogue='flights')
+get_timetable = _timetable.get
+
+
+def fare_range(flights, seat):
+    if not flights:
+        return 0, 0
+    return fare_of(flights[0], seat), fare_of(flights[-1], seat)
+
+
+def search_trip(origin, destination, weekday, seat, trip_type, return_weekday=None):
+    """
+    Outbound (and, for round trips, return) flights with their fare ranges.
+    Results are cached per flights-catalogue version, so any Flight or Place change retires them.
+    """
+    seat = (seat or '').lower()
+    key = (f"search:{catalogue.version('flights')}:{origin.upper()}:{destination.upper()}:"
+           f"{weekday}:{seat}:{trip_type}:{return_weekday}")
+    result = cache.get(key)
+    if result is None:
+        timetable = get_timetable()
+        flights = timetable.search(origin, destination, weekday, seat)
+        result = {'flights': flights, 'prices': fare_range(flights, seat)}
+        if return_weekday is not None:
+            flights2 = timetable.search(destination, origin, return_weekday, seat)
+            result.update({'flights2': flights2, 'prices2': fare_range(flights2, seat)})
+        cache.set(key, result, SEARCH_TIMEOUT)
+    return result
+
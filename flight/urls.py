@@ -8,11 +8,16 @@ urlpatterns = [
     path("register", views.register_view, name="register"),
     path("query/places/<str:q>", views.query, name="query"),
     path("flight", views.flight, name="flight"),
+    path("flight/api/search", views.search_api, name="searchapi"),
+    path("flight/api/connections", views.connections_api, name="connectionsapi"),
+    path("flight/api/calendar", views.fare_calendar_api, name="farecalendar"),
     path("review", views.review, name="review"),
     path("flight/ticket/book", views.book, name="book"),
     path("flight/ticket/payment", views.payment, name="payment"),
+    path('flight/ticket/api', views.ticket_data_batch, name="ticketdatabatch"),
     path('flight/ticket/api/<str:ref>', views.ticket_data, name="ticketdata"),
     path('flight/ticket/print',views.get_ticket, name="getticket"),
+    path('flight/ticket/export', views.export_tickets, name="exporttickets"),
     path('flight/bookings', views.bookings, name="bookings"),
     path('flight/ticket/cancel', views.cancel_ticket, name="cancelticket"),
     path('flight/ticket/resume', views.resume_booking, name="resumebooking"),
@@ -1,100 +1,198 @@
+import csv
+import time
+from operator import attrgetter
 from datetime import timedelta, datetime
-from flight.models import *
-from .models import Week, Place, Flight
-
-# Optional tqdm import for progress bars
-try:
-    from tqdm import tqdm
-except ImportError:
-    # Fallback if tqdm is not available
-    def tqdm(iterable, total=None):
-        return iterable
-
-def get_number_of_lines(file):
-    with open(file) as f:
-        for i, l in enumerate(f):
-            pass
-    return i + 1
-
-def createWeekDays():
-    days = ['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday']
-    for i,day in enumerate(days):
-        Week.objects.create(number=i, name=day)
-
-def addPlaces():
-    file = open("./Data/airports.csv", "r")
-    print("Adding Airports...")
-    total = get_number_of_lines("./Data/airports.csv")
-    for i, line in tqdm(enumerate(file), total=total):
-        if i == 0:
-            continue
-        data = line.split(',')
-        city = data[0].strip()
-        airport = data[1].strip()
-        code = data[2].strip()
-        country = data[3].strip()
-        try:
-            Place.objects.create(city=city, airport=airport, code=code, country=country)
-        except Exception as e:
-            continue
-    print("Done.\n")
+
+from django.conf import settings
+from django.db import transaction
+
+from . import fares
+from .models import Week, Place, Flight, schedule_hash, weekday_mask
+
+DATA_DIR = settings.BASE_DIR / "Data"
+AIRPORTS_CSV = DATA_DIR / "airports.csv"
+DOMESTIC_FLIGHTS_CSV = DATA_DIR / "domestic_flights.csv"
+INTERNATIONAL_FLIGHTS_CSV = DATA_DIR / "international_flights.csv"
+
+WEEKDAYS = ['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday']
+BATCH_SIZE = 1000
+
+
+def read_places(path=AIRPORTS_CSV):
+    with open(path, newline='', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            yield {
+                'city': row['city'].strip(),
+                'airport': row['airport'].strip(),
+                'code': row['code'].strip().upper(),
+                'country': row['country'].strip(),
+            }
+
+def parse_fare(value):
+    value = value.strip()
+    return float(value) if value else 0.0
+
+def read_flights(path):
+    """Stream a schedule CSV, yielding one dict per row with place codes left unresolved."""
+    with open(path, newline='', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            hours, minutes = row['duration'].strip().split(':')[:2]
+            yield {
+                'origin': row['origin'].strip().upper(),
+                'destination': row['destination'].strip().upper(),
+                'depart_time': datetime.strptime(row['depart_time'].strip(), "%H:%M:%S").time(),
+                'weekday': int(row['depart_weekday']),
+                'duration': timedelta(hours=int(hours), minutes=int(minutes)),
+                'arrival_time': datetime.strptime(row['arrival_time'].strip(), "%H:%M:%S").time(),
+                'flight_no': row['flight_no'].strip(),
+                'airline': row['airline'].strip(),
+                'economy_fare': parse_fare(row['economy_fare']),
+                'business_fare': parse_fare(row['business_fare']),
+                'first_fare': parse_fare(row['first_fare']),
+            }
+
+FLIGHT_FIELDS = ['airline', 'duration', 'economy_fare', 'business_fare', 'first_fare']
+
+def build_flight(row, places):
+    operating_days = weekday_mask(row['weekday'])
+    return Flight(
+        origin_id=places[row['origin']], destination_id=places[row['destination']],
+        depart_time=row['depart_time'], operating_days=operating_days,
+        duration=row['duration'], arrival_time=row['arrival_time'], plane=row['flight_no'],
+        airline=row['airline'], economy_fare=row['economy_fare'],
+        business_fare=row['business_fare'], first_fare=row['first_fare'],
+        schedule_hash=schedule_hash(
+            row['flight_no'], row['origin'], row['destination'],
+            operating_days, row['depart_time'], row['arrival_time'],
+        ),
+    )
+
+def batches(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def new_stats():
+    return {
+        'created': 0, 'updated': 0, 'unchanged': 0, 'retired': 0, 'skipped': 0,
+        'duplicates': 0, 'conflicts': 0, 'fare_days': set(), 'started': time.perf_counter(),
+    }
+
+def report(label, stats):
+    elapsed = time.perf_counter() - stats['started']
+    rows = stats['created'] + stats['updated'] + stats['unchanged']
+    rate = rows / elapsed if elapsed else float(rows)
+    line = (f"{label}: {stats['created']} created, {stats['updated']} updated, {stats['unchanged']} unchanged"
+            f" in {elapsed:.2f}s ({rate:.0f} rows/sec)")
+    if stats['retired']:
+        line += f", {stats['retired']} retired"
+    if stats['skipped']:
+        line += f", {stats['skipped']} skipped"
+    if stats['duplicates']:
+        line += (f", {stats['duplicates']} duplicate rows dropped"
+                 f" ({stats['conflicts']} with different fares, last row kept)")
+    return line
+
+def upsert(queryset, key, rows, fields, batch_size=BATCH_SIZE, stats=None):
+    """
+    Bulk-insert the rows whose natural key is not in `queryset` and bulk-update the ones whose `fields` differ.
+    `rows` are unsaved model instances and `key` maps an instance to its natural key; when several rows
+    share a key the last one wins.
+    """
+    stats = stats or new_stats()
+    existing = {key(obj): obj for obj in queryset}
+    creates, updates = [], []
+    for natural_key, row in {key(row): row for row in rows}.items():
+        current = existing.get(natural_key)
+        if current is None:
+            creates.append(row)
+        elif any(getattr(current, field) != getattr(row, field) for field in fields):
+            row.pk = current.pk
+            updates.append(row)
+        else:
+            stats['unchanged'] += 1
+    with transaction.atomic():
+        queryset.model.objects.bulk_create(creates, batch_size=batch_size)
+        queryset.model.objects.bulk_update(updates, fields, batch_size=batch_size)
+    stats['created'] += len(creates)
+    stats['updated'] += len(updates)
+    return stats
+
+def createWeekDays(batch_size=BATCH_SIZE):
+    weeks = [Week(number=i, name=day) for i, day in enumerate(WEEKDAYS)]
+    return upsert(Week.objects.all(), attrgetter('number'), weeks, ['name'], batch_size)
+
+def addPlaces(path=AIRPORTS_CSV, batch_size=BATCH_SIZE):
+    places = (Place(**row) for row in read_places(path))
+    return upsert(Place.objects.all(), attrgetter('code'), places, ['city', 'airport', 'country'], batch_size)
+
+def load_flights(paths, batch_size=BATCH_SIZE, retire_missing=False):
+    """
+    Sync the Flight table with the given schedule CSVs, touching only the rows that differ.
+
+    Flights are matched on Flight.schedule_hash: unseen hashes are bulk-inserted and known ones
+    whose fares (or airline/duration) changed are bulk-updated. With `retire_missing`, active flights
+    absent from the files, and duplicate rows sharing a hash, are marked retired rather than deleted
+    so existing tickets keep their flight. Rows naming an unknown airport are skipped. When several rows
+    share a hash the last one wins; the dropped rows are counted in `duplicates`, and in `conflicts`
+    too when their airline, duration or fares differ from the kept row's. `fare_days` collects the
+    (origin_id, destination_id, weekday) triples of every written row, for fares.refresh().
+    """
+    stats = new_stats()
+    places = dict(Place.objects.values_list('code', 'id'))
+
+    existing, duplicates = {}, []
+    route_fields = ['origin_id', 'destination_id', 'operating_days']
+    for row in Flight.objects.order_by('id').values_list('id', 'schedule_hash', 'retired', *route_fields, *FLIGHT_FIELDS):
+        if row[1] in existing:
+            duplicates.append(row)
+        else:
+            existing[row[1]] = row
+
+    flights = {}
+    for path in paths:
+        for row in read_flights(path):
+            if row['origin'] in places and row['destination'] in places:
+                flight = build_flight(row, places)
+                previous = flights.get(flight.schedule_hash)
+                if previous is not None:
+                    stats['duplicates'] += 1
+                    if any(getattr(previous, field) != getattr(flight, field) for field in FLIGHT_FIELDS):
+                        stats['conflicts'] += 1
+                flights[flight.schedule_hash] = flight   # last row for a flight wins
+            else:
+                stats['skipped'] += 1
+
+    creates, updates = [], []
+    for key, flight in flights.items():
+        current = existing.get(key)
+        if current is None:
+            creates.append(flight)
+        elif current[2] or current[6:] != tuple(getattr(flight, field) for field in FLIGHT_FIELDS):
+            flight.pk = current[0]
+            updates.append(flight)
+        else:
+            stats['unchanged'] += 1
+
+    retire = []
+    if retire_missing:
+        retire = [row for key, row in existing.items() if key not in flights and not row[2]]
+        retire += [row for row in duplicates if not row[2]]
+    for flight in creates + updates:
+        stats['fare_days'] |= fares.route_days(flight.origin_id, flight.destination_id, flight.operating_days)
+    for row in retire:
+        stats['fare_days'] |= fares.route_days(*row[3:6])
+    retire = [row[0] for row in retire]
+
+    with transaction.atomic():
+        Flight.objects.bulk_create(creates, batch_size=batch_size)
+        Flight.objects.bulk_update(updates, FLIGHT_FIELDS + ['retired'], batch_size=batch_size)
+        for ids in batches(retire, batch_size):
+            Flight.objects.filter(id__in=ids).update(retired=True)
+    stats['created'], stats['updated'], stats['retired'] = len(creates), len(updates), len(retire)
+    return stats
 
 def addDomesticFlights():
-    file = open("./Data/domestic_flights.csv", "r")
-    print("Adding Domestic Flights...")
-    total = get_number_of_lines("./Data/domestic_flights.csv")
-    for i, line in tqdm(enumerate(file), total=total):
-        if i == 0:
-            continue
-        data = line.split(',')
-        origin = data[1].strip()
-        destination = data[2].strip()
-        depart_time = datetime.strptime(data[3].strip(), "%H:%M:%S").time()
-        depart_week = int(data[4].strip())
-        duration = timedelta(hours=int(data[5].strip()[:2]), minutes=int(data[5].strip()[3:5]))
-        arrive_time = datetime.strptime(data[6].strip(), "%H:%M:%S").time()
-        arrive_week = int(data[7].strip())
-        flight_no = data[8].strip()
-        airline = data[10].strip()
-        economy_fare = float(data[11].strip()) if data[11].strip() else 0.0
-        business_fare = float(data[12].strip()) if data[12].strip() else 0.0
-        first_fare = float(data[13].strip()) if data[13].strip() else 0.0
-
-        try:
-            a1 = Flight.objects.create(origin=Place.objects.get(code=origin), destination=Place.objects.get(code=destination), depart_time=depart_time , duration=duration, arrival_time=arrive_time, plane=flight_no, airline=airline, economy_fare=economy_fare, business_fare=business_fare, first_fare=first_fare)
-            a1.depart_day.add(Week.objects.get(number=depart_week))
-            a1.save()
-        except Exception as e:
-            print(e)
-            return
-    print("Done.\n")
+    print(report("Domestic flights", load_flights([DOMESTIC_FLIGHTS_CSV])))
 
 def addInternationalFlights():
-    file = open("./Data/international_flights.csv", "r")
-    print("Adding International Flights...")
-    total = get_number_of_lines("./Data/international_flights.csv")
-    for i, line in tqdm(enumerate(file), total=total):
-        if i == 0:
-            continue
-        data = line.split(',')
-        origin = data[1].strip()
-        destination = data[2].strip()
-        depart_time = datetime.strptime(data[3].strip(), "%H:%M:%S").time()
-        depart_week = int(data[4].strip())
-        duration = timedelta(hours=int(data[5].strip()[:2]), minutes=int(data[5].strip()[3:5]))
-        arrive_time = datetime.strptime(data[6].strip(), "%H:%M:%S").time()
-        arrive_week = int(data[7].strip())
-        flight_no = data[8].strip()
-        airline = data[10].strip()
-        economy_fare = float(data[11].strip()) if data[11].strip() else 0.0
-        business_fare = float(data[12].strip()) if data[12].strip() else 0.0
-        first_fare = float(data[13].strip()) if data[13].strip() else 0.0
-
-        try:
-            a1 = Flight.objects.create(origin=Place.objects.get(code=origin), destination=Place.objects.get(code=destination), depart_time=depart_time , duration=duration, arrival_time=arrive_time, plane=flight_no, airline=airline, economy_fare=economy_fare, business_fare=business_fare, first_fare=first_fare)
-            a1.depart_day.add(Week.objects.get(number=depart_week))
-            a1.save()
-        except Exception as e:
-            print(e)
-            return
-    print("Done.\n")
+    print(report("International flights", load_flights([INTERNATIONAL_FLIGHTS_CSV])))
@@ -1,33 +1,35 @@
 from django.shortcuts import render, HttpResponse, HttpResponseRedirect
 from django.urls import reverse
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth import authenticate, login, logout
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Count, Q
 
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import math
 from .models import *
-from capstone.utils import render_to_pdf, createticket
+from capstone.utils import createticket
+from .timetable import get_timetable, search_trip
+from .fares import fare_calendar
+from .connections import find_connections, MAX_STOPS
+from .search import FlightSearch, DEFAULT_PAGE_SIZE as SEARCH_PAGE_SIZE, MAX_PAGE_SIZE as SEARCH_MAX_PAGE_SIZE
+from . import autocomplete, catalogue, export, inventory, ticketdata, pdf as ticket_pdf
+from .refs import next_ref
+from .idempotency import idempotent
+from .autocomplete import DEFAULT_LIMIT, MAX_LIMIT
 
 
 #Fee and Surcharge variable
 from .constant import FEE
-from flight.utils import createWeekDays, addPlaces, addDomesticFlights, addInternationalFlights
 
-try:
-    if len(Week.objects.all()) == 0:
-        createWeekDays()
-
-    if len(Place.objects.all()) == 0:
-        addPlaces()
-
-    if len(Flight.objects.all()) == 0:
-        print("Do you want to add flights in the Database? (y/n)")
-        if input().lower() in ['y', 'yes']:
-            addDomesticFlights()
-            addInternationalFlights()
-except:
-    pass
+PLACES_MAX_AGE = getattr(settings, 'PLACES_CACHE_MAX_AGE', 5 * 60)
+CALENDAR_MAX_DAYS = getattr(settings, 'CALENDAR_MAX_DAYS', 31)
+EXPORT_MAX_TICKETS = getattr(settings, 'TICKET_EXPORT_MAX', 200)
+TICKET_BATCH_MAX = getattr(settings, 'TICKET_BATCH_MAX', 50)
 
 # Create your views here.
 
@@ -119,14 +121,32 @@ def logout_view(request):
     logout(request)
     return HttpResponseRedirect(reverse("index"))
 
+def places_etag(encoding):
+    # Each content coding is a different representation, so each gets its own strong validator.
+    return f'"places-{catalogue.version("places")}-{encoding}"'
+
+def places_last_modified():
+    return datetime.fromtimestamp(catalogue.modified_at('places'), tz=timezone.utc)
+
 def query(request, q):
-    places = Place.objects.all()
-    filters = []
-    q = q.lower()
-    for place in places:
-        if (q in place.city.lower()) or (q in place.airport.lower()) or (q in place.code.lower()) or (q in place.country.lower()):
-            filters.append(place)
-    return JsonResponse([{'code':place.code, 'city':place.city, 'country': place.country} for place in filters], safe=False)
+    try:
+        limit = min(max(int(request.GET.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+    except ValueError:
+        limit = DEFAULT_LIMIT
+    variants = autocomplete.response_variants(q, limit)
+    encoding = autocomplete.pick_encoding(variants, request.headers.get('Accept-Encoding', ''))
+    etag = places_etag(encoding)
+    last_modified = places_last_modified()
+    response = get_conditional_response(request, etag=etag, last_modified=int(last_modified.timestamp()))
+    if response is None:
+        response = HttpResponse(variants[encoding], content_type='application/json')
+        if encoding != 'identity':
+            response['Content-Encoding'] = encoding
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified.timestamp())
+    patch_vary_headers(response, ['Accept-Encoding'])
+    patch_cache_control(response, public=True, max_age=PLACES_MAX_AGE)
+    return response
 
 @csrf_exempt
 def flight(request):
@@ -135,71 +155,26 @@ def flight(request):
     trip_type = request.GET.get('TripType')
     departdate = request.GET.get('DepartDate')
     depart_date = datetime.strptime(departdate, "%Y-%m-%d")
+    seat = request.GET.get('SeatClass')
+
+    timetable = get_timetable()
+    origin = timetable.place(o_place)
+    destination = timetable.place(d_place)
+
     return_date = None
     if trip_type == '2':
         returndate = request.GET.get('ReturnDate')
         return_date = datetime.strptime(returndate, "%Y-%m-%d")
-        flightday2 = Week.objects.get(number=return_date.weekday()) ##
-        origin2 = Place.objects.get(code=d_place.upper())   ##
-        destination2 = Place.objects.get(code=o_place.upper())  ##
-    seat = request.GET.get('SeatClass')
+        origin2 = destination   ##
+        destination2 = origin   ##
 
-    flightday = Week.objects.get(number=depart_date.weekday())
-    destination = Place.objects.get(code=d_place.upper())
-    origin = Place.objects.get(code=o_place.upper())
-    if seat == 'economy':
-        flights = Flight.objects.filter(depart_day=flightday,origin=origin,destination=destination).exclude(economy_fare=0).order_by('economy_fare')
-        try:
-            max_price = flights.last().economy_fare
-            min_price = flights.first().economy_fare
-        except:
-            max_price = 0
-            min_price = 0
-
-        if trip_type == '2':    ##
-            flights2 = Flight.objects.filter(depart_day=flightday2,origin=origin2,destination=destination2).exclude(economy_fare=0).order_by('economy_fare')    ##
-            try:
-                max_price2 = flights2.last().economy_fare   ##
-                min_price2 = flights2.first().economy_fare  ##
-            except:
-                max_price2 = 0  ##
-                min_price2 = 0  ##
-                
-    elif seat == 'business':
-        flights = Flight.objects.filter(depart_day=flightday,origin=origin,destination=destination).exclude(business_fare=0).order_by('business_fare')
-        try:
-            max_price = flights.last().business_fare
-            min_price = flights.first().business_fare
-        except:
-            max_price = 0
-            min_price = 0
-
-        if trip_type == '2':    ##
-            flights2 = Flight.objects.filter(depart_day=flightday2,origin=origin2,destination=destination2).exclude(business_fare=0).order_by('business_fare')    ##
-            try:
-                max_price2 = flights2.last().business_fare   ##
-                min_price2 = flights2.first().business_fare  ##
-            except:
-                max_price2 = 0  ##
-                min_price2 = 0  ##
-
-    elif seat == 'first':
-        flights = Flight.objects.filter(depart_day=flightday,origin=origin,destination=destination).exclude(first_fare=0).order_by('first_fare')
-        try:
-            max_price = flights.last().first_fare
-            min_price = flights.first().first_fare
-        except:
-            max_price = 0
-            min_price = 0
-            
-        if trip_type == '2':    ##
-            flights2 = Flight.objects.filter(depart_day=flightday2,origin=origin2,destination=destination2).exclude(first_fare=0).order_by('first_fare')
-            try:
-                max_price2 = flights2.last().first_fare   ##
-                min_price2 = flights2.first().first_fare  ##
-            except:
-                max_price2 = 0  ##
-                min_price2 = 0  ##    ##
+    trip = search_trip(origin.code, destination.code, depart_date.weekday(), seat, trip_type,
+                       return_date.weekday() if return_date else None)
+    flights = trip['flights']
+    min_price, max_price = trip['prices']
+    if trip_type == '2':
+        flights2 = trip['flights2']    ##
+        min_price2, max_price2 = trip['prices2']   ##
 
     #print(calendar.day_name[depart_date.weekday()])
     if trip_type == '2':
@@ -232,6 +207,77 @@ def flight(request):
             'min_price': math.floor(min_price/100)*100
         })
 
+def optional_float(value):
+    return float(value) if value not in (None, '') else None
+
+def search_api(request):
+    try:
+        depart_date = datetime.strptime(request.GET.get('DepartDate', ''), "%Y-%m-%d")
+        search = FlightSearch(
+            request.GET.get('Origin', ''), request.GET.get('Destination', ''),
+            depart_date.weekday(), request.GET.get('SeatClass'),
+            min_price=optional_float(request.GET.get('min_price')),
+            max_price=optional_float(request.GET.get('max_price')),
+            departure_slots=request.GET.getlist('departure'),
+            arrival_slots=request.GET.getlist('arrival'),
+            airlines=request.GET.getlist('airline'),
+            sort=request.GET.get('sort', 'price'),
+        )
+        page = max(int(request.GET.get('page', 1)), 1)
+        page_size = min(max(int(request.GET.get('page_size', SEARCH_PAGE_SIZE)), 1), SEARCH_MAX_PAGE_SIZE)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    total, flights = search.page(page, page_size)
+    return JsonResponse({
+        'total': total,
+        'page': page,
+        'page_size': page_size,
+        'pages': math.ceil(total / page_size),
+        'fares': search.fare_bounds(),
+        'facets': search.facets(),
+        'flights': flights
+    })
+
+def connections_api(request):
+    try:
+        depart_date = datetime.strptime(request.GET.get('DepartDate', ''), "%Y-%m-%d").date()
+        max_stops = int(request.GET.get('max_stops', MAX_STOPS))
+        if not 0 <= max_stops <= MAX_STOPS:
+            raise ValueError(f"max_stops must be between 0 and {MAX_STOPS}")
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    return JsonResponse(find_connections(
+        request.GET.get('Origin', ''), request.GET.get('Destination', ''),
+        depart_date, request.GET.get('SeatClass', 'economy'), max_stops,
+    ))
+
+def calendar_window(params):
+    """(start, end) dates for either ?month=YYYY-MM or ?DepartDate=YYYY-MM-DD&days=N (N days either side)."""
+    if params.get('month'):
+        start = datetime.strptime(params['month'], "%Y-%m").date()
+        end = (start + timedelta(days=31)).replace(day=1) - timedelta(days=1)
+        return start, end
+    day = datetime.strptime(params.get('DepartDate', ''), "%Y-%m-%d").date()
+    days = int(params.get('days', 3))
+    if not 0 <= days <= CALENDAR_MAX_DAYS:
+        raise ValueError(f"days must be between 0 and {CALENDAR_MAX_DAYS}")
+    return day - timedelta(days=days), day + timedelta(days=days)
+
+def fare_calendar_api(request):
+    try:
+        start, end = calendar_window(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    seat = request.GET.get('SeatClass', 'economy').lower()
+    days = fare_calendar(request.GET.get('Origin', ''), request.GET.get('Destination', ''), seat, start, end)
+    return JsonResponse({
+        'seat': seat,
+        'fares': [{'date': day.isoformat(), 'min_fare': fare} for day, fare in days],
+    })
+
 def review(request):
     flight_1 = request.GET.get('flight1Id')
     date1 = request.GET.get('flight1Date')
@@ -245,14 +291,14 @@ def review(request):
         date2 = request.GET.get('flight2Date')
 
     if request.user.is_authenticated:
-        flight1 = Flight.objects.get(id=flight_1)
+        flight1 = Flight.objects.with_places().get(id=flight_1)
         flight1ddate = datetime(int(date1.split('-')[2]),int(date1.split('-')[1]),int(date1.split('-')[0]),flight1.depart_time.hour,flight1.depart_time.minute)
         flight1adate = (flight1ddate + flight1.duration)
         flight2 = None
         flight2ddate = None
         flight2adate = None
         if round_trip:
-            flight2 = Flight.objects.get(id=flight_2)
+            flight2 = Flight.objects.with_places().get(id=flight_2)
             flight2ddate = datetime(int(date2.split('-')[2]),int(date2.split('-')[1]),int(date2.split('-')[0]),flight2.depart_time.hour,flight2.depart_time.minute)
             flight2adate = (flight2ddate + flight2.duration)
         #print("//////////////////////////////////")
@@ -279,6 +325,7 @@ def review(request):
     else:
         return HttpResponseRedirect(reverse("login"))
 
+@idempotent
 def book(request):
     if request.method == 'POST':
         if request.user.is_authenticated:
@@ -294,40 +341,37 @@ def book(request):
             countrycode = request.POST['countryCode']
             mobile = request.POST['mobile']
             email = request.POST['email']
-            flight1 = Flight.objects.get(id=flight_1)
-            if f2:
-                flight2 = Flight.objects.get(id=flight_2)
             passengerscount = request.POST['passengersCount']
             passengers=[]
             for i in range(1,int(passengerscount)+1):
                 fname = request.POST[f'passenger{i}FName']
                 lname = request.POST[f'passenger{i}LName']
                 gender = request.POST[f'passenger{i}Gender']
-                passengers.append(Passenger.objects.create(first_name=fname,last_name=lname,gender=gender.lower()))
+                passengers.append(Passenger(first_name=fname,last_name=lname,gender=gender.lower()))
             coupon = request.POST.get('coupon')
             
             try:
-                ticket1 = createticket(request.user,passengers,passengerscount,flight1,flight_1date,flight_1class,coupon,countrycode,email,mobile)
-                if f2:
-                    ticket2 = createticket(request.user,passengers,passengerscount,flight2,flight_2date,flight_2class,coupon,countrycode,email,mobile)
-
-                if(flight_1class == 'Economy'):
+                # References are claimed before the transaction, so a rollback can't return them for reuse.
+                refs = [next_ref() for _ in range(2 if f2 else 1)]
+                # All or nothing: a failure part-way must not leave passengers or PENDING tickets behind.
+                with transaction.atomic():
+                    flights = Flight.objects.in_bulk([flight_1, flight_2] if f2 else [flight_1])
+                    flight1 = flights[int(flight_1)]
                     if f2:
-                        fare = (flight1.economy_fare*int(passengerscount))+(flight2.economy_fare*int(passengerscount))
-                    else:
-                        fare = flight1.economy_fare*int(passengerscount)
-                elif (flight_1class == 'Business'):
+                        flight2 = flights[int(flight_2)]
+                    passengers = Passenger.objects.bulk_create(passengers)
+                    ticket1 = createticket(request.user,passengers,passengerscount,flight1,flight_1date,flight_1class,coupon,countrycode,email,mobile,refs[0])
                     if f2:
-                        fare = (flight1.business_fare*int(passengerscount))+(flight2.business_fare*int(passengerscount))
-                    else:
-                        fare = flight1.business_fare*int(passengerscount)
-                elif (flight_1class == 'First'):
-                    if f2:
-                        fare = (flight1.first_fare*int(passengerscount))+(flight2.first_fare*int(passengerscount))
-                    else:
-                        fare = flight1.first_fare*int(passengerscount)
+                        ticket2 = createticket(request.user,passengers,passengerscount,flight2,flight_2date,flight_2class,coupon,countrycode,email,mobile,refs[1])
+
+                # Price from what was actually written, whatever the case or cabin of the class fields.
+                fare = ticket1.flight_fare + (ticket2.flight_fare if f2 else 0)
+            except inventory.SoldOut as e:
+                return HttpResponse(e, status=409)
+            except DatabaseError as e:
+                return HttpResponse(e, status=503)
             except Exception as e:
-                return HttpResponse(e)
+                return HttpResponse(e, status=400)
             
 
             if f2:    ##
@@ -345,6 +389,7 @@ def book(request):
     else:
         return HttpResponse("Method must be post.")
 
+@idempotent
 def payment(request):
     if request.user.is_authenticated:
         if request.method == 'POST':
@@ -362,13 +407,16 @@ def payment(request):
 
             try:
                 ticket = Ticket.objects.get(id=ticket_id)
-                ticket.status = 'CONFIRMED'
-                ticket.booking_date = datetime.now()
-                ticket.save()
+                if not inventory.confirm(ticket):
+                    return HttpResponse("This booking has expired or was cancelled.", status=409)
+                ticket.refresh_from_db()
+                ticket_pdf.warm(ticket)
                 if t2:
                     ticket2 = Ticket.objects.get(id=ticket2_id)
-                    ticket2.status = 'CONFIRMED'
-                    ticket2.save()
+                    if not inventory.confirm(ticket2):
+                        return HttpResponse("This booking has expired or was cancelled.", status=409)
+                    ticket2.refresh_from_db()
+                    ticket_pdf.warm(ticket2)
                     return render(request, 'flight/payment_process.html', {
                         'ticket1': ticket,
                         'ticket2': ticket2
@@ -377,8 +425,12 @@ def payment(request):
                     'ticket1': ticket,
                     'ticket2': ""
                 })
+            except Ticket.DoesNotExist as e:
+                return HttpResponse(e, status=404)
+            except DatabaseError as e:
+                return HttpResponse(e, status=503)
             except Exception as e:
-                return HttpResponse(e)
+                return HttpResponse(e, status=400)
         else:
             return HttpResponse("Method must be post.")
     else:
@@ -386,33 +438,109 @@ def payment(request):
 
 
 def ticket_data(request, ref):
-    ticket = Ticket.objects.get(ref_no=ref)
+    data = ticketdata.get(ref)
+    if data is None:
+        return JsonResponse({'error': f"Unknown ticket: {ref}"}, status=404)
+    response = get_conditional_response(request, etag=data['etag'])
+    if response is None:
+        response = HttpResponse(data['body'], content_type='application/json')
+    response['ETag'] = data['etag']
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+def ticket_data_batch(request):
+    if not request.user.is_authenticated:
+        return HttpResponseRedirect(reverse('login'))
+    refs = list(dict.fromkeys(ref for value in request.GET.getlist('ref') for ref in value.upper().split(',') if ref))
+    if not refs:
+        return JsonResponse({'error': "Give one or more refs."}, status=400)
+    if len(refs) > TICKET_BATCH_MAX:
+        return JsonResponse({'error': f"At most {TICKET_BATCH_MAX} refs per request."}, status=400)
+    # Other users' tickets are reported as missing, so refs can't be probed for someone else's bookings.
+    found = {ref: entry for ref, entry in ticketdata.get_many(refs).items() if entry.get('user') == request.user.pk}
     return JsonResponse({
-        'ref': ticket.ref_no,
-        'from': ticket.flight.origin.code,
-        'to': ticket.flight.destination.code,
-        'flight_date': ticket.flight_ddate,
-        'status': ticket.status
+        'tickets': {ref: found[ref]['data'] for ref in refs if ref in found},
+        'missing': [ref for ref in refs if ref not in found]
     })
 
 @csrf_exempt
 def get_ticket(request):
     ref = request.GET.get("ref")
-    ticket1 = Ticket.objects.get(ref_no=ref)
-    data = {
-        'ticket1':ticket1,
-        'current_year': datetime.now().year
-    }
-    pdf = render_to_pdf('flight/ticket.html', data)
-    return HttpResponse(pdf, content_type='application/pdf')
-
+    try:
+        ticket1 = ticket_pdf.load_ticket(ref)
+    except Ticket.DoesNotExist:
+        raise Http404(f"Unknown ticket: {ref}")
+    html = ticket_pdf.ticket_html(ticket1)
+    etag = f'"{ticket_pdf.content_hash(html)}"'
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    try:
+        path = ticket_pdf.render(ticket1, html)
+    except (ticket_pdf.PDFUnavailable, TimeoutError) as e:
+        return HttpResponse(str(e), status=503)
+    response = FileResponse(open(path, 'rb'), content_type='application/pdf', filename=f"ticket-{ref}.pdf")
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def optional_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+
+def export_tickets(request):
+    if not request.user.is_authenticated:
+        return HttpResponseRedirect(reverse('login'))
+    refs = [ref for value in request.GET.getlist('ref') for ref in value.upper().split(',') if ref]
+    try:
+        booked_from = optional_date(request.GET.get('from'))
+        booked_to = optional_date(request.GET.get('to'))
+    except ValueError as e:
+        return HttpResponse(str(e), status=400)
+    if not (refs or booked_from or booked_to):
+        return HttpResponse("Give one or more refs or a booking date range.", status=400)
+
+    tickets = list(export.user_tickets(request.user, refs, booked_from, booked_to)[:EXPORT_MAX_TICKETS + 1])
+    if not tickets:
+        raise Http404("No matching tickets.")
+    if len(tickets) > EXPORT_MAX_TICKETS:
+        return HttpResponse(f"At most {EXPORT_MAX_TICKETS} tickets can be exported at once.", status=400)
+    if not ticket_pdf.available():
+        return HttpResponse("PDF tickets need xhtml2pdf installed.", status=503)
+    response = StreamingHttpResponse(export.zip_stream(tickets), content_type='application/zip')
+    response['Content-Disposition'] = 'attachment; filename="tickets.zip"'
+    return response
+
+
+def parse_bookings_cursor(cursor):
+    """`before` cursors are "<booking_date isoformat>_<ticket id>" of the last ticket on the previous page."""
+    try:
+        booked, ticket_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(booked), int(ticket_id)
+    except (AttributeError, ValueError):
+        return None
 
 def bookings(request):
     if request.user.is_authenticated:
-        tickets = Ticket.objects.filter(user=request.user).order_by('-booking_date')
+        tickets = (Ticket.objects.filter(user=request.user)
+                   .select_related('flight__origin', 'flight__destination')
+                   .annotate(passenger_count=Count('passengers'))
+                   .order_by('-booking_date', '-id'))
+        cursor = parse_bookings_cursor(request.GET.get('before'))
+        if cursor:
+            booked, ticket_id = cursor
+            tickets = tickets.filter(Q(booking_date__lt=booked) | Q(booking_date=booked, id__lt=ticket_id))
+        per_page = getattr(settings, 'BOOKINGS_PER_PAGE', 20)
+        page = list(tickets[:per_page + 1])
+        next_cursor = None
+        if len(page) > per_page:
+            page = page[:per_page]
+            next_cursor = f"{page[-1].booking_date.isoformat()}_{page[-1].id}"
         return render(request, 'flight/bookings.html', {
             'page': 'bookings',
-            'tickets': tickets
+            'tickets': page,
+            'cursor': cursor,
+            'next_cursor': next_cursor
         })
     else:
         return HttpResponseRedirect(reverse('login'))
@@ -425,8 +553,7 @@ def cancel_ticket(request):
             try:
                 ticket = Ticket.objects.get(ref_no=ref)
                 if ticket.user == request.user:
-                    ticket.status = 'CANCELLED'
-                    ticket.save()
+                    inventory.cancel(ticket)
                     return JsonResponse({'success': True})
                 else:
                     return JsonResponse({